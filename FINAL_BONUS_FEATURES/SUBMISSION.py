@@ -1,13 +1,20 @@
 import time
-import collections
+PROCESS_START = time.perf_counter()  # for the startup time report
+import asyncio
+import atexit
+import math
+import sys
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.collections import LineCollection
-from matplotlib.colors import Normalize
 
 import serial
 import serial.tools.list_ports
 import kconvert
+import acq_engine
+from ringbuffer import RingBuffer
+from liveplot import BlitRenderer, minmax_decimate, line_segments
+from de10_stream import DE10StreamParser
+from stagetimer import StageTimer
+from ticker import Ticker
 
 METER_PORT = "COM12"
 METER_BAUD = 9600
@@ -20,10 +27,21 @@ CJ_TEMP_C = 21.2
 INITIAL_WINDOW = 160
 FINAL_WINDOW   = 700
 DRAW_RATE      = 0.05
+XLIM_STEP      = 5.0
+PLOT_BUFFER_SIZE = 65536
+LOOP_PERIOD    = 0.5  # seconds per sample (ticker.py); the DMM gives about 2.5 readings/s at RATE S
+USE_ASYNC_ENGINE = False  # True = meter, DE10, console and plot as asyncio tasks (acq_engine.py)
+PROFILE_STAGES = True  # per-stage latency stats: printed at exit, on SIGUSR1/Ctrl+Break or key 'i'
+HEADLESS = "--headless" in sys.argv[1:]  # console only: no plot window and matplotlib is never imported
 Y_MIN, Y_MAX   = 0, 250
 
-cmap = plt.get_cmap("coolwarm")
-norm = Normalize(vmin=Y_MIN, vmax=Y_MAX)
+if not HEADLESS:
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import LineCollection
+    from matplotlib.colors import Normalize
+
+    cmap = plt.get_cmap("coolwarm")
+    norm = Normalize(vmin=Y_MIN, vmax=Y_MAX)
 
 def open_meter(port: str) -> serial.Serial:
     ser = serial.Serial(port, METER_BAUD, timeout=0.5)
@@ -62,19 +80,20 @@ def open_de10(port: str):
     print(f"[OK] DE10 opened: {port} @ {DE10_BAUD}")
     return ser2
 
+de10_parser = DE10StreamParser()
+
 def read_de10_temp(ser2: serial.Serial, last_temp: float):
     if ser2 is None:
         return last_temp
 
-    temp = last_temp
-    while ser2.in_waiting > 0:
-        try:
-            line = ser2.readline().decode(errors="ignore").strip()
-            if line:
-                temp = float(line)
-        except ValueError:
-            pass
-    return temp
+    # Everything waiting in one read; only the newest temperature line matters
+    de10_parser.feed(ser2.read(ser2.in_waiting))
+    return last_temp if de10_parser.temp is None else de10_parser.temp
+
+def read_de10_batch(ser2: serial.Serial):
+    """Body of the DE10 reader thread (async engine): the temperatures that came in, or None."""
+    temps = de10_parser.read(ser2)[1]
+    return temps if len(temps) else None
 
 print("Available serial ports:")
 for p in serial.tools.list_ports.comports():
@@ -92,81 +111,162 @@ try:
 except Exception as e:
     print(f"[WARN] Failed to open Multimeter: {e}")
 
-plt.ion()
-fig, ax = plt.subplots(figsize=(10, 6))
-ax.set_title("Reflow Oven Temperature Profile")
-ax.set_xlabel("Time (s)")
-ax.set_ylabel("Temperature (°C)")
-ax.set_ylim(Y_MIN, Y_MAX)
-ax.grid(True)
+if not HEADLESS:
+    plt.ion()
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.set_title("Reflow Oven Temperature Profile")
+    ax.set_xlabel("Time (s)")
+    ax.set_ylabel("Temperature (°C)")
+    ax.set_ylim(Y_MIN, Y_MAX)
+    ax.grid(True)
+
+    lc = LineCollection([], linewidth=3, cmap=cmap, norm=norm)
+    ax.add_collection(lc)
+
+    line_dmm, = ax.plot([], [], color='gray', linestyle='--', linewidth=1.5, label='DMM Benchmark')
+    ax.legend(loc='upper right')
 
-lc = LineCollection([], linewidth=3, cmap=cmap, norm=norm)
-ax.add_collection(lc)
+    info_text = ax.text(
+        0.02, 0.98, "", transform=ax.transAxes,
+        ha="left", va="top", bbox=dict(boxstyle="round", facecolor="white", alpha=0.85)
+    )
 
-line_dmm, = ax.plot([], [], color='gray', linestyle='--', linewidth=1.5, label='DMM Benchmark')
-ax.legend(loc='upper right')
+    renderer = BlitRenderer(fig, ax, [lc, line_dmm, info_text])
 
-info_text = ax.text(
-    0.02, 0.98, "", transform=ax.transAxes,
-    ha="left", va="top", bbox=dict(boxstyle="round", facecolor="white", alpha=0.85)
-)
+timer = StageTimer(enabled=PROFILE_STAGES)
+timer.dump_on_exit()
+timer.dump_on_signal()
+if not HEADLESS:
+    fig.canvas.mpl_connect("key_press_event", lambda event: event.key == "i" and timer.dump())
 
-xs = collections.deque()
-ys_meter = collections.deque()
-ys_opamp = collections.deque()
+plot_buf = RingBuffer(PLOT_BUFFER_SIZE, ncols=3, seg_col=2)  # t, DMM, DE10
+de10_min, de10_max = float("inf"), float("-inf")
 
-start = time.time()
 last_draw = 0.0
+first_sample = None
 
-last_de10_temp = CJ_TEMP_C
+def record_sample(t, meter_temp, opamp_temp):
+    """Console output, plot buffer and DE10 min/max for one sample."""
+    global de10_min, de10_max, first_sample
+    print(f"DMM: {meter_temp:6.1f} °C  |  DE10: {opamp_temp:6.1f} °C")
+    if first_sample is None:
+        first_sample = time.perf_counter() - PROCESS_START
+        print(f"[STARTUP] first sample on the console {first_sample:.3f} s after start")
+
+    plot_buf.append(t, meter_temp, opamp_temp)
+    de10_min = min(de10_min, opamp_temp)
+    de10_max = max(de10_max, opamp_temp)
+
+def plot_draw():
+    """Scrolls the x axis to the newest sample and redraws, at most once every DRAW_RATE seconds. True if it drew."""
+    global last_draw
+    if len(plot_buf) == 0:
+        return False
+    t, opamp_temp = plot_buf.last(0), plot_buf.last(2)
+    if t < INITIAL_WINDOW:
+        xlim = (0, INITIAL_WINDOW)
+    else:
+        right = math.ceil(t / XLIM_STEP) * XLIM_STEP if XLIM_STEP else t
+        xlim = (0, right) if right < FINAL_WINDOW else (right - FINAL_WINDOW, right)
+    if xlim != ax.get_xlim():
+        ax.set_xlim(*xlim)
+
+    now = time.time()
+    if now - last_draw < DRAW_RATE:
+        return False
+    n = plot_buf.count_since(t - FINAL_WINDOW)
+    if n > 1:
+        x, y_dmm, y_de10 = plot_buf.view(0, n), plot_buf.view(1, n), plot_buf.view(2, n)
+        buckets = int(ax.bbox.width)
+        if n > 2 * buckets:
+            x_de10, y_de10 = minmax_decimate(x, y_de10, buckets)
+            lc.set_segments(line_segments(x_de10, y_de10))
+            x, y_dmm = minmax_decimate(x, y_dmm, buckets)
+        else:
+            lc.set_segments(plot_buf.segments(n))
+        lc.set_array(y_de10[:-1])
+
+        line_dmm.set_data(x, y_dmm)
+
+    info_text.set_text(
+        f"DE10 Min:     {de10_min:6.1f} °C\n"
+        f"DE10 Max:     {de10_max:6.1f} °C\n"
+        f"DE10 Current: {opamp_temp:6.1f} °C"
+    )
+    renderer.update()
+    last_draw = now
+    return True
+
+async def run_async_engine():
+    """
+    The loop below as asyncio tasks: the meter and the DE10 are read in their
+    own threads, so a slow DMM reply no longer holds up the DE10 or the plot,
+    and every meter reading is a sample (the meter sets the pace, not LOOP_PERIOD).
+    """
+    engine = acq_engine.AcquisitionEngine()
+    raw = acq_engine.Broadcast()
+    if ser:
+        engine.source("meter", timer.timed("meter read", lambda: read_meter_vdc(ser)), raw)
+    if ser2:
+        engine.source("de10", timer.timed("de10 read", lambda: read_de10_batch(ser2)), raw)
+
+    # Transform: one sample per meter reading, with the newest DE10 temperature
+    # (per DE10 batch when there is no meter, like the loop's fallback)
+    state = {"start": time.time(), "opamp_temp": round(CJ_TEMP_C, 1)}
+    def convert(item):
+        name, ts, sample = item
+        if name == "de10":
+            state["opamp_temp"] = round(float(sample[-1]), 1)
+            if ser:
+                return None
+            meter_temp = plot_buf.last(1) if len(plot_buf) else CJ_TEMP_C
+        else:
+            meter_temp = round(volts_to_tempC(sample, CJ_TEMP_C), 1)
+        return ts - state["start"], meter_temp, state["opamp_temp"]
+    samples = engine.transform(raw, timer.timed("kconvert", convert))
+
+    engine.sink(samples, timer.timed("console", lambda r: record_sample(*r)), maxsize=4096)
+    if not HEADLESS:
+        engine.every(DRAW_RATE, timer.timed("plot + draw", plot_draw))
+
+    await engine.run()
 
 print("\nStarting Data Acquisition.")
 print("Format: DMM Temp (°C) | DE10 Op-Amp Temp (°C)")
 
+if USE_ASYNC_ENGINE:
+    asyncio.run(run_async_engine())
+    sys.exit()  # the engine did the whole run: don't fall through into the loop below
+
+ticker = Ticker(LOOP_PERIOD)  # without it the loop spins at 100% CPU when a port is missing
+atexit.register(lambda: print(ticker.report()))
+last_de10_temp = CJ_TEMP_C
+
 while True:
+    # The ticker sleeps until the next deadline, not for a whole LOOP_PERIOD, so
+    # the time the meter read below blocks comes out of the sleep; only a read
+    # longer than LOOP_PERIOD makes a tick late (an overrun in ticker.report())
+    ticker.wait()
+    t_loop = timer.now()
     v_meter = read_meter_vdc(ser) if ser else None
-    meter_temp = round(volts_to_tempC(v_meter, CJ_TEMP_C), 1) if v_meter is not None else ys_meter[-1] if ys_meter else CJ_TEMP_C
+    t = time.monotonic() - ticker.t0  # when the reading came in, seconds since the first tick
+    t_sample = t_stage = timer.lap("meter read", t_loop)
+    meter_temp = round(volts_to_tempC(v_meter, CJ_TEMP_C), 1) if v_meter is not None else plot_buf.last(1) if len(plot_buf) else CJ_TEMP_C
+    t_stage = timer.lap("kconvert", t_stage)
 
     last_de10_temp = read_de10_temp(ser2, last_de10_temp)
     opamp_temp = round(last_de10_temp, 1)
+    t_stage = timer.lap("de10 read", t_stage)
 
-    t = time.time() - start
-
-    print(f"DMM: {meter_temp:6.1f} °C  |  DE10: {opamp_temp:6.1f} °C")
+    record_sample(t, meter_temp, opamp_temp)
+    t_stage = timer.lap("console", t_stage)
 
-    xs.append(t)
-    ys_meter.append(meter_temp)
-    ys_opamp.append(opamp_temp)
-
-    if len(xs) > 1:
-        x_arr = np.asarray(xs, dtype=float)
-        
-        y_arr_opamp = np.asarray(ys_opamp, dtype=float)
-        points = np.column_stack((x_arr, y_arr_opamp)).reshape(-1, 1, 2)
-        segs = np.concatenate([points[:-1], points[1:]], axis=1)
-        lc.set_segments(segs)
-        lc.set_array(y_arr_opamp[:-1])
-
-        line_dmm.set_xdata(x_arr)
-        line_dmm.set_ydata(ys_meter)
-
-    y_arr_legend = np.asarray(ys_opamp, dtype=float)
-    if y_arr_legend.size:
-        info_text.set_text(
-            f"DE10 Min:     {float(np.nanmin(y_arr_legend)):6.1f} °C\n"
-            f"DE10 Max:     {float(np.nanmax(y_arr_legend)):6.1f} °C\n"
-            f"DE10 Current: {float(y_arr_legend[-1]):6.1f} °C"
-        )
+    if HEADLESS:
+        timer.lap("loop", t_loop)
+        continue
 
-    if t < INITIAL_WINDOW:
-        ax.set_xlim(0, INITIAL_WINDOW)
-    elif t < FINAL_WINDOW:
-        ax.set_xlim(0, t)
-    else:
-        ax.set_xlim(t - FINAL_WINDOW, t)
-
-    now = time.time()
-    if now - last_draw >= DRAW_RATE:
-        fig.canvas.draw()
-        fig.canvas.flush_events()
-        last_draw = now
+    if plot_draw():
+        timer.lap("plot + draw", t_stage)
+        # No write-back in this script: end to end is meter reading -> on screen
+        timer.lap("sample->display", t_sample)
+    timer.lap("loop", t_loop)
@@ -1,17 +1,35 @@
+import argparse
+import atexit
 import time
-import collections
+PROCESS_START = time.perf_counter()  # for the startup time report, before the other imports
+import math
+import sys
+import csv
 import random
 import re
+import threading
+import asyncio
 
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.collections import LineCollection
-from matplotlib.colors import Normalize
+# matplotlib is only imported by setup_plot(), so HEADLESS runs never load it
 
 import serial
 import serial.tools.list_ports
 
 import kconvert
+import serial_reader
+import acq_engine
+from csvlog import CSVLogger
+import runlog
+import portscan
+from meter_driver import PipelinedMeter
+from stagetimer import StageTimer
+from de10_stream import DE10StreamParser, DE10FrameParser
+from ringbuffer import RingBuffer
+from ticker import Ticker
+from reconnect import Link
+from writeback import WriteBack
+from liveplot import BlitRenderer, minmax_decimate, line_segments
 
 # ============================================================
 # CONFIGURATION (edit these)
@@ -20,6 +38,10 @@ import kconvert
 # --- Multimeter (PRIMARY) ---
 METER_PORT = "COM12"      # user said COM12
 METER_BAUD = 9600
+METER_RATE = "S"          # "S" slow (~2.5/s, most digits), "M" medium (~5/s), "F" fast (~20/s, fewest digits)
+METER_PIPELINE = True     # keep the next MEAS1? queued in the meter (meter_driver.py)
+METER_OPEN_WAIT = 2.0     # seconds to wait for the meter at start; after that it is reconnected in the background
+METER_LOST_AFTER = 10.0   # seconds without a reading before the meter is reopened
 
 # --- DE10 / N76E003 (SECONDARY) ---
 USE_DE10 = True
@@ -30,6 +52,7 @@ DE10_BAUD = 115200
 CJ_TEMP_C = 21.2          # cold junction temperature used by kconvert
 
 # The DE10 now sends: "A0=HHLL\r\n" where HH=ADC_H (hex) and LL=ADC_L (hex)
+DE10_BINARY_FRAMES = False  # True for firmware assembled with ADC0_BINARY = 1 (5-byte frames + fsm_state)
 ADC_BITS = 12             # N76E003 ADC is typically 12-bit
 ADC_VREF = 3.30           # volts. Set to 3.30 unless you know your analog reference differs.
 
@@ -40,38 +63,56 @@ OPAMP_OFFSET_V = 0.0      # <-- set if your op-amp adds a DC offset
 
 # --- What temperature to SEND to DE10 for LCD/7-seg ---
 SEND_TO_DE10 = 'opamp'    # 'opamp' or 'meter'
+WRITEBACK_KEEPALIVE = 1.0 # seconds: the temperature is only sent when it changes, or this often (writeback.py)
 
 # --- Delta limiter toggle (settable) ---
 ENABLE_DELTA_LIMITER = True
 DELTA_LIMIT_C = 1.8       # degrees C
 DELTA_STEP_C = 0.1        # discrete step for randomized limiter (0.1, 0.2, ...)
 
+# --- Acquisition loop ---
+USE_ASYNC_ENGINE = False  # True = run the stages as asyncio tasks (acq_engine.py)
+LOOP_PERIOD = 0.1         # seconds per loop tick (ticker.py); None = one pass per new sample, at the DMM's pace
+LOG_CSV = None            # e.g. "reflow_run.csv" to also log every sample
+LOG_BINARY = None         # e.g. "reflow_run.rlog" for the compact binary log (runlog.py)
+CAPTURE_RAW = None        # e.g. "reflow_raw.csv": raw DMM volts + DE10 counts, to rerun with replay.py
+PROFILE_STAGES = True     # per-stage latency stats (stagetimer.py): printed at exit, on SIGUSR1/Ctrl+Break or key 'i'
+HEADLESS = False          # True (or --headless) = no plot and no matplotlib: logging + DE10 write-back only
+
 # ============================================================
 # PLOTTING CONFIG
 # ============================================================
 INITIAL_WINDOW = 160
 FINAL_WINDOW   = 700
 DRAW_RATE      = 0.05
+XLIM_STEP      = 5.0      # seconds; the x window moves in steps so most frames can be blitted (0 = every sample)
+PLOT_BUFFER_SIZE = 65536  # samples kept for the plot (FINAL_WINDOW s at up to ~90 samples/s)
 Y_MIN, Y_MAX   = 0, 300
 
-cmap = plt.get_cmap("coolwarm")
-norm = Normalize(vmin=Y_MIN, vmax=Y_MAX)
-
 # ============================================================
 # MULTIMETER HELPERS
 # ============================================================
 
 def open_meter(port: str) -> serial.Serial:
+    global meter
     ser = serial.Serial(port, METER_BAUD, timeout=0.5)
-    time.sleep(0.2)
-    # get prompt
-    ser.write(b"\x03")
-    ser.readline()
-    ser.timeout = 3
-    ser.write(b"VDC; RATE S; *IDN?\r\n")
-    _idn = ser.readline().decode(errors="ignore").strip()
-    ser.readline()  # discard prompt
-    ser.write(b"MEAS1?\r\n")
+    try:
+        time.sleep(0.2)
+        if METER_PIPELINE:
+            meter = PipelinedMeter(ser, rate=METER_RATE)
+            _idn = meter.open()
+        else:
+            # get prompt
+            ser.write(b"\x03")
+            ser.readline()
+            ser.timeout = 3
+            ser.write(f"VDC; RATE {METER_RATE}; *IDN?\r\n".encode())
+            _idn = ser.readline().decode(errors="ignore").strip()
+            ser.readline()  # discard prompt
+            ser.write(b"MEAS1?\r\n")
+    except BaseException:
+        ser.close()  # a failed open must not keep the port (on Windows the retries could never get it)
+        raise
     print(f"[OK] Multimeter opened: {port}")
     print(f"[IDN] {_idn}")
     return ser
@@ -90,6 +131,44 @@ def read_meter_vdc(ser: serial.Serial):
     except Exception:
         return None
 
+meter_link = None  # reconnect.Link that keeps the meter open, see main
+last_meter_reading = time.monotonic()
+
+def read_meter_or_reconnect():
+    """
+    Body of the multimeter reader thread: one reading, or None. When the
+    reading fails the port is handed back to meter_link, which reopens it in
+    its own thread with backoff; meanwhile this returns None every 0.5 s.
+    """
+    global last_meter_reading
+    ser = meter_link.get()
+    if ser is None:
+        meter_link.wait_up(0.5)
+        last_meter_reading = time.monotonic()
+        return None
+    if METER_PIPELINE:
+        # None only means no reading within the port timeout, and the driver
+        # resyncs a stuck meter by itself: reconnect when the port fails, or
+        # when resyncing has not brought a reading back for METER_LOST_AFTER.
+        try:
+            v_meter = meter.read()
+        except Exception as e:
+            meter_link.lost(e)
+            return None
+        if v_meter is not None:
+            last_meter_reading = time.monotonic()
+        elif time.monotonic() - last_meter_reading > METER_LOST_AFTER:
+            meter_link.lost(f"no reading for {METER_LOST_AFTER:.0f} s")
+        return v_meter
+    v_meter = read_meter_vdc(ser)
+    if v_meter is None:
+        meter_link.lost()
+    return v_meter
+
+def meter_down():
+    """True while the meter is disconnected (samples then carry meter_temp = NaN)."""
+    return meter_link is not None and meter_link.get() is None
+
 def volts_to_tempC(v_volts: float, cj_c: float) -> float:
     mv = v_volts * 1000.0
     return float(kconvert.mV_to_C(mv, cj_c))
@@ -109,6 +188,14 @@ def list_ports():
     return ports
 
 def auto_pick_de10_port(meter_port: str):
+    """
+    The port an ADC0 frame arrives on (all ports are listened to at once, the
+    one from last time first, see portscan.py), else the first port that is
+    not the meter.
+    """
+    port = portscan.find_de10(exclude=[meter_port])
+    if port is not None:
+        return port
     ports = list(serial.tools.list_ports.comports())
     for p in ports:
         dev = p.device if hasattr(p, "device") else p[0]
@@ -164,6 +251,19 @@ def read_de10_stream(ser2: serial.Serial, last_temp: float, last_adc_counts: int
     except Exception:
         return last_temp, last_adc_counts, False, False
 
+de10_parser = DE10FrameParser() if DE10_BINARY_FRAMES else DE10StreamParser()
+FSM_STATE_NAMES = ("IDLE", "PREHEAT", "SOAK", "RAMP", "REFLOW", "COOL", "ABORT")
+
+def read_de10_batch(ser2: serial.Serial):
+    """
+    Body of the DE10 reader thread: every line that came in since the last call,
+    decoded in bulk, as (adc_counts array, temp array). None if no complete line came in.
+    """
+    counts, temps = de10_parser.read(ser2)
+    if len(counts) == 0 and len(temps) == 0:
+        return None
+    return counts, temps
+
 def adc_counts_to_volts(counts: int) -> float:
     max_counts = (1 << ADC_BITS) - 1
     if counts is None:
@@ -201,160 +301,424 @@ def apply_delta_limiter(ktemp: float, opamp_temp: float):
         return ktemp - offset
 
 # ============================================================
-# MAIN
+# PIPELINE STAGES (shared by the plain loop and the asyncio engine)
 # ============================================================
 
-print("Available serial ports:")
-list_ports()
-
-# --- Open DE10 first (optional) ---
-ser2 = None
-if USE_DE10:
-    port = DE10_PORT
-    if port is None:
-        port = auto_pick_de10_port(METER_PORT)
-    if port is None:
-        print("[WARN] Could not auto-pick DE10 port (only saw the meter port).")
-        print("       Set DE10_PORT = 'COMx' manually.")
-    else:
-        try:
-            ser2 = open_de10(port)
-        except Exception as e:
-            print(f"[WARN] Failed to open DE10 port {port}: {e}")
-            ser2 = None
-
-# --- Open meter (fixed COM12) ---
-ser = None
-try:
-    ser = open_meter(METER_PORT)
-except Exception as e:
-    print(f"[ERROR] Failed to open multimeter on {METER_PORT}: {e}")
-    print("Available serial ports:")
-    list_ports()
-    raise
-
-# --- Plot setup ---
-plt.ion()
-fig, ax = plt.subplots()
-ax.set_title("Reflow Oven Temp")
-ax.set_xlabel("Time (s)")
-ax.set_ylabel("Temperature (C)")
-ax.set_ylim(Y_MIN, Y_MAX)
-ax.grid(True)
-
-lc = LineCollection([], linewidth=2, cmap=cmap, norm=norm)
-ax.add_collection(lc)
-
-info_text = ax.text(
-    0.02, 0.98, "",
-    transform=ax.transAxes,
-    ha="left", va="top",
-    bbox=dict(boxstyle="round", facecolor="white", alpha=0.85)
-)
-
-xs = collections.deque()
-ys_meter = collections.deque()
-ys_opamp = collections.deque()
-
-start = time.time()
-last_draw = 0.0
-
-last_de10_temp = 0.0
-last_adc0 = 0  # raw counts
-
-print("Starting Data Acquisition.")
-print("Format: meter_temp | opamp_temp | delta")
-
-while True:
-    # --- A) Multimeter read ---
-    v_meter = read_meter_vdc(ser)
-    if v_meter is None:
-        # try reconnect
-        try:
-            ser.close()
-        except Exception:
-            pass
-        time.sleep(0.5)
-        ser = open_meter(METER_PORT)
-        continue
+timer = StageTimer(enabled=PROFILE_STAGES)
 
-    t = time.time() - start
-    meter_temp = round(volts_to_tempC(v_meter, CJ_TEMP_C), 1)
+def process_sample(meter_temp: float, adc_counts: int):
+    """ADC0 -> op-amp voltage -> op-amp temperature, then the delta limiter."""
+    opamp_v = adc_counts_to_volts(adc_counts)
+    opamp_temp = round(opamp_volts_to_tempC(opamp_v, CJ_TEMP_C), 1)
+    opamp_temp_limited = round(apply_delta_limiter(meter_temp, opamp_temp), 1)
+    delta = round(abs(meter_temp - opamp_temp_limited), 1)
+    return opamp_temp_limited, delta
 
-    # --- B) DE10 read (grab both temp-line and ADC0 lines as they come) ---
-    if ser2:
-        for _ in range(5):
-            last_de10_temp, last_adc0, got_temp, got_adc_line = read_de10_stream(
-                ser2, last_de10_temp, last_adc0
-            )
+de10_writer = None  # writeback.WriteBack on the DE10 port, see main
+
+def send_to_de10(meter_temp: float, opamp_temp_limited: float):
+    """
+    Offer the chosen temperature to the DE10 for LCD/7-seg/FSM. It is only
+    written when it changed or the keepalive is due; returns True if it was.
+    """
+    try:
+        if SEND_TO_DE10.lower() == 'meter' and math.isfinite(meter_temp):
+            to_send = meter_temp
+        else:
+            to_send = opamp_temp_limited
+        return de10_writer.submit(to_send)
+    except Exception:
+        return False
 
-    # --- C) Convert ADC0 -> opamp voltage -> opamp temperature ---
-    opamp_v = adc_counts_to_volts(last_adc0)
-    opamp_temp = opamp_volts_to_tempC(opamp_v, CJ_TEMP_C)
-    opamp_temp = round(opamp_temp, 1)
+first_write_back = None
 
-    # --- D) Delta limiter (optional) ---
-    opamp_temp_limited = apply_delta_limiter(meter_temp, opamp_temp)
-    opamp_temp_limited = round(opamp_temp_limited, 1)
+def note_write_back():
+    """Reports the startup time (process start -> first write-back to the DE10), once."""
+    global first_write_back
+    if first_write_back is None:
+        first_write_back = time.perf_counter() - PROCESS_START
+        print(f"[STARTUP] first write-back to the DE10 {first_write_back:.3f} s after start")
 
-    delta = round(abs(meter_temp - opamp_temp_limited), 1)
+def plot_update(t: float, meter_temp: float, opamp_temp_limited: float):
+    """Add one sample to the plot buffer (the artists are updated in plot_draw())."""
+    global t_min, t_max
+    plot_buf.append(t, meter_temp, opamp_temp_limited)
 
-    # --- Send chosen temperature to DE10 for LCD/7-seg/FSM ---
-    if ser2:
-        try:
-            if SEND_TO_DE10.lower() == 'meter':
-                to_send = meter_temp
-            else:
-                to_send = opamp_temp_limited
-            ser2.write(f"{to_send:.1f}\n".encode())
-        except Exception:
-            pass
-
-    # --- E) Console output ---
-    print(f"{meter_temp:6.1f} {opamp_temp_limited:6.1f} {delta:4.1f}")
-
-    # --- F) Plot update ---
-    xs.append(t)
-    ys_meter.append(meter_temp)
-    ys_opamp.append(opamp_temp_limited)
-
-    if len(xs) > 1:
-        x_arr = np.asarray(xs, dtype=float)
-        y_arr = np.asarray(ys_meter, dtype=float)
-
-        points = np.column_stack((x_arr, y_arr)).reshape(-1, 1, 2)
-        segs = np.concatenate([points[:-1], points[1:]], axis=1)
-        lc.set_segments(segs)
-        lc.set_array(y_arr[:-1])
-
-    # Legend: only show min/max/current temperature (C)
-    y_arr_legend = np.asarray(ys_meter, dtype=float)
-    if y_arr_legend.size:
-        t_min = float(np.nanmin(y_arr_legend))
-        t_max = float(np.nanmax(y_arr_legend))
-        t_cur = float(y_arr_legend[-1])
-        info_text.set_text(
-            f"Min:     {t_min:6.1f} C\n"
-            f"Max:     {t_max:6.1f} C\n"
-            f"Current: {t_cur:6.1f} C"
-        )
-    else:
-        info_text.set_text(
-            "Min:      ---- C\n"
-            "Max:      ---- C\n"
-            "Current:  ---- C"
-        )
+    # Legend: only show min/max/current temperature (C), kept up to date per sample
+    t_min = min(t_min, meter_temp)
+    t_max = max(t_max, meter_temp)
 
-    # windowing
+    # windowing (only touch the axes when the window really moves: that forces a full redraw)
     if t < INITIAL_WINDOW:
-        ax.set_xlim(0, INITIAL_WINDOW)
-    elif t < FINAL_WINDOW:
-        ax.set_xlim(0, t)
+        xlim = (0, INITIAL_WINDOW)
     else:
-        ax.set_xlim(t - FINAL_WINDOW, t)
-
+        right = math.ceil(t / XLIM_STEP) * XLIM_STEP if XLIM_STEP else t
+        xlim = (0, right) if right < FINAL_WINDOW else (right - FINAL_WINDOW, right)
+    if xlim != ax.get_xlim():
+        ax.set_xlim(*xlim)
+
+def plot_draw():
+    """Update the artists and redraw, at most once every DRAW_RATE seconds (blitted when possible)."""
+    global last_draw
     now = time.time()
-    if now - last_draw >= DRAW_RATE:
-        fig.canvas.draw()
+    if now - last_draw < DRAW_RATE or len(plot_buf) == 0:
         fig.canvas.flush_events()
-        last_draw = now
+        return
+    last_draw = now
+    t0 = timer.now()
+
+    # Only the visible window goes to the LineCollection, as views into the buffer.
+    # Past about one sample per pixel it is cut down to a min/max envelope.
+    n = plot_buf.count_since(plot_buf.last(0) - FINAL_WINDOW)
+    if n > 1:
+        buckets = int(ax.bbox.width)
+        if n > 2 * buckets:
+            x, y = minmax_decimate(plot_buf.view(0, n), plot_buf.view(1, n), buckets)
+            lc.set_segments(line_segments(x, y))
+        else:
+            y = plot_buf.view(1, n)
+            lc.set_segments(plot_buf.segments(n))
+        lc.set_array(y[:-1])
+
+    text = (
+        f"Min:     {t_min:6.1f} C\n"
+        f"Max:     {t_max:6.1f} C\n"
+        f"Current: {plot_buf.last(1):6.1f} C"
+    )
+    state = getattr(de10_parser, "state", None)  # only binary frames carry fsm_state
+    if state is not None:
+        text += f"\nState:   {FSM_STATE_NAMES[state] if state < len(FSM_STATE_NAMES) else state}"
+    if meter_down():
+        text += f"\nMeter:   {meter_link.state} {time.monotonic() - meter_link.down_since:.0f} s"
+    info_text.set_text(text)
+    renderer.update()
+    timer.lap("draw", t0)
+
+def setup_plot():
+    """Create the figure, its artists and the plot buffer used by plot_update()/plot_draw()."""
+    global plt, fig, ax, lc, info_text, renderer, plot_buf, t_min, t_max, last_draw
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import LineCollection
+    from matplotlib.colors import Normalize
+
+    plt.ion()
+    fig, ax = plt.subplots()
+    ax.set_title("Reflow Oven Temp")
+    ax.set_xlabel("Time (s)")
+    ax.set_ylabel("Temperature (C)")
+    ax.set_ylim(Y_MIN, Y_MAX)
+    ax.grid(True)
+
+    lc = LineCollection([], linewidth=2, cmap=plt.get_cmap("coolwarm"), norm=Normalize(vmin=Y_MIN, vmax=Y_MAX))
+    ax.add_collection(lc)
+
+    info_text = ax.text(
+        0.02, 0.98, "",
+        transform=ax.transAxes,
+        ha="left", va="top",
+        bbox=dict(boxstyle="round", facecolor="white", alpha=0.85)
+    )
+
+    renderer = BlitRenderer(fig, ax, [lc, info_text])
+    fig.canvas.mpl_connect("key_press_event", lambda event: event.key == "i" and timer.dump())
+
+    plot_buf = RingBuffer(PLOT_BUFFER_SIZE, ncols=3, seg_col=1)  # t, meter_temp, opamp_temp
+    t_min, t_max = float("inf"), float("-inf")
+    last_draw = 0.0
+
+def capture_raw(name: str, ts: float, sample):
+    """Raw-stream capture for replay: the DMM voltage, or every ADC0 count of a DE10 batch."""
+    t = f"{ts - start:.4f}"
+    if name == "meter":
+        raw_capture.writerow([t, "meter", sample])
+    else:
+        for counts in sample[0]:
+            raw_capture.writerow([t, "de10", int(counts)])
+
+async def run_async_engine():
+    """Same pipeline as the main loop, with every stage as its own asyncio task."""
+    engine = acq_engine.AcquisitionEngine()
+
+    # Producers: DMM and DE10, each from its own thread-backed stream
+    raw = acq_engine.Broadcast()
+    engine.source("meter", timer.timed("meter read", read_meter_or_reconnect), raw)
+    if ser2:
+        engine.source("de10", timer.timed("de10 read", lambda: read_de10_batch(ser2)), raw)
+
+    # Transform: kconvert + delta limiter, on every DMM reading and every batch of ADC0 lines
+    state = {"meter_temp": None, "adc0": 0}
+    def convert(item):
+        name, ts, sample = item
+        if name == "meter":
+            state["meter_temp"] = round(volts_to_tempC(sample, CJ_TEMP_C), 1)
+        else:
+            if len(sample[1]) and de10_writer:
+                de10_writer.check_echo(sample[1])  # echoes are checked as they come in, nothing waits for them
+            if not len(sample[0]):
+                return None  # DE10 echo of our own write-back, nothing new to process
+            state["adc0"] = int(sample[0][-1])  # newest ADC0 reading of the batch
+        if meter_down():
+            state["meter_temp"] = float("nan")  # the DE10 path keeps going without the meter
+        if state["meter_temp"] is None:
+            return None
+        opamp_temp_limited, delta = process_sample(state["meter_temp"], state["adc0"])
+        return ts - start, state["meter_temp"], opamp_temp_limited, delta, state["adc0"]
+    temps = engine.transform(raw, timer.timed("kconvert + limiter", convert))
+    if raw_capture:
+        engine.sink(raw, lambda item: capture_raw(*item), maxsize=4096)
+
+    # Sinks: write-back gets only the newest value; console, CSV and plot get every sample
+    def write_back(r):
+        t0 = timer.now()
+        if send_to_de10(r[1], r[2]):
+            note_write_back()
+            timer.record("sample->write-back", int((time.time() - start - r[0]) * 1e9))
+        timer.lap("write-back", t0)
+    if ser2:
+        engine.sink(temps, write_back, blocking=True)
+        engine.every(LOOP_PERIOD or DRAW_RATE, de10_writer.poll)  # merged values and the keepalive
+    engine.sink(temps, lambda r: print(f"{r[1]:6.1f} {r[2]:6.1f} {r[3]:4.1f}"), maxsize=4096)
+    if csv_writer:
+        engine.sink(temps, lambda r: csv_writer.writerow(r[:4]), maxsize=4096)
+    if run_log:
+        engine.sink(temps, lambda r: run_log.write(r[0], r[1], r[4], r[2]), maxsize=4096)
+    if not HEADLESS:
+        engine.sink(temps, timer.timed("plot update", lambda r: plot_update(*r[:3])), maxsize=4096)
+        engine.every(DRAW_RATE, plot_draw)
+
+    await engine.run()
+
+# ============================================================
+# REPLAY (see replay.py)
+# ============================================================
+
+def load_capture(filename: str):
+    """
+    The events of a recorded run, oldest first, as (t, source, value):
+    ("meter", volts) and ("de10", counts) from a CAPTURE_RAW file, or
+    ("rlog", (meter_temp, adc0)) from a LOG_BINARY run log, whose meter
+    readings are already converted.
+    """
+    if filename.endswith(".rlog"):
+        run = runlog.open_run(filename)
+        return [(t, "rlog", (meter_c, adc0)) for t, meter_c, adc0
+                in zip(run.t.tolist(), run.meter_temp.tolist(), run.adc0.tolist())]
+    with open(filename, newline="") as f:
+        reader = csv.reader(f)
+        next(reader)  # header
+        events = [(float(t), source, float(value)) for t, source, value in reader]
+    events.sort(key=lambda e: e[0])  # written per reader batch, so only sorted per source
+    return events
+
+def replay_capture(events, speed: float = 0.0, headless: bool = True, seed=None, verbose: bool = False):
+    """
+    Runs recorded events through the same stages as the main loop (kconvert,
+    process_sample(), plot_update()/plot_draw()) with the current settings.
+    speed 0 runs as fast as possible, N runs at N x real time. Returns an
+    (n, 4) array: t, meter_temp, opamp_temp_limited, delta per processed sample.
+    """
+    global last_draw
+    if seed is not None:
+        random.seed(seed)  # the delta limiter is randomized
+    if not headless:
+        setup_plot()
+    out = []
+    meter_temp = None
+    last_adc0 = 0
+    wall_start = time.monotonic()
+    for t, source, value in events:
+        if speed:
+            delay = wall_start + t / speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        if source == "meter":
+            meter_temp = round(volts_to_tempC(value, CJ_TEMP_C), 1)
+        elif source == "de10":
+            last_adc0 = int(value)
+        else:
+            meter_temp, last_adc0 = round(value[0], 1), value[1]
+        if meter_temp is None:
+            continue
+
+        opamp_temp_limited, delta = process_sample(meter_temp, last_adc0)
+        out.append((t, meter_temp, opamp_temp_limited, delta))
+        if verbose:
+            print(f"{t:8.2f} {meter_temp:6.1f} {opamp_temp_limited:6.1f} {delta:4.1f}")
+        if not headless:
+            plot_update(t, meter_temp, opamp_temp_limited)
+            plot_draw()
+    if not headless and out:
+        last_draw = 0.0
+        plot_draw()  # the last samples
+    return np.array(out, dtype=float).reshape(-1, 4)
+
+# ============================================================
+# MAIN
+# ============================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reflow oven acquisition: multimeter + DE10")
+    parser.add_argument("--headless", action="store_true", help="no plot window, matplotlib is never imported")
+    parser.add_argument("--meter-port", help=f"multimeter port (default {METER_PORT})")
+    parser.add_argument("--de10-port", help="DE10 port (default DE10_PORT, or auto-pick)")
+    args = parser.parse_args()
+    HEADLESS = HEADLESS or args.headless
+    METER_PORT = args.meter_port or METER_PORT
+    DE10_PORT = args.de10_port or DE10_PORT
+
+    print("Available serial ports:")
+    list_ports()
+
+    # --- Open DE10 first (optional) ---
+    ser2 = None
+    if USE_DE10:
+        port = DE10_PORT
+        if port is None:
+            port = auto_pick_de10_port(METER_PORT)
+        if port is None:
+            print("[WARN] Could not auto-pick DE10 port (only saw the meter port).")
+            print("       Set DE10_PORT = 'COMx' manually.")
+        else:
+            try:
+                ser2 = open_de10(port)
+            except Exception as e:
+                print(f"[WARN] Failed to open DE10 port {port}: {e}")
+                ser2 = None
+    if ser2:
+        de10_writer = WriteBack(ser2, keepalive=WRITEBACK_KEEPALIVE)
+        atexit.register(lambda: print(de10_writer.report(), file=sys.stderr))
+
+    # --- Open meter (fixed COM12), and keep it open from the background ---
+    meter_link = Link("meter", lambda: open_meter(METER_PORT), close_func=lambda ser: ser.close())
+    meter_link.start()
+    if not meter_link.wait_up(METER_OPEN_WAIT):
+        print(f"[WARN] No multimeter on {METER_PORT} yet: {meter_link.error}")
+        print("       Running on the DE10 alone until it answers. Available serial ports:")
+        list_ports()
+    atexit.register(lambda: print(meter_link.report(), file=sys.stderr))
+
+    # --- Plot setup ---
+    if not HEADLESS:
+        setup_plot()
+
+    csv_writer = None
+    if LOG_CSV:
+        csv_writer = CSVLogger(LOG_CSV, ["t", "meter_temp", "opamp_temp", "delta"])
+
+    start = time.time()
+
+    run_log = None
+    if LOG_BINARY:
+        run_log = runlog.RunLogWriter(LOG_BINARY, CJ_TEMP_C, ADC_BITS, ADC_VREF,
+                                      OPAMP_GAIN, OPAMP_OFFSET_V, start_time=start)
+
+    raw_capture = None
+    if CAPTURE_RAW:
+        raw_capture = CSVLogger(CAPTURE_RAW, ["t", "source", "value"])
+
+    timer.dump_on_exit()
+    timer.dump_on_signal()
+
+    print("Starting Data Acquisition.")
+    print("Format: meter_temp | opamp_temp | delta")
+
+    if USE_ASYNC_ENGINE:
+        asyncio.run(run_async_engine())
+        sys.exit()  # the engine did the whole run: don't fall through into the loop below
+
+    ticker = Ticker(LOOP_PERIOD) if LOOP_PERIOD else None
+    if ticker:
+        atexit.register(lambda: print(ticker.report(), file=sys.stderr))
+
+    # --- Reader threads: one per port, so a slow DMM reply never holds up the DE10 ---
+    new_data = threading.Event()
+    meter_reader = serial_reader.SerialReader("meter", timer.timed("meter read", read_meter_or_reconnect),
+                                              wake=new_data)
+    meter_reader.start()
+    de10_reader = None
+    if ser2:
+        de10_reader = serial_reader.SerialReader("de10", timer.timed("de10 read", lambda: read_de10_batch(ser2)),
+                                                 wake=new_data)
+        de10_reader.start()
+
+    last_de10_temp = 0.0
+    last_adc0 = 0  # raw counts
+    meter_temp = None  # until the first multimeter reading
+    start_monotonic = time.monotonic() - (time.time() - start)  # tick times are monotonic
+
+    while True:
+        if ticker:
+            # Sleep until the next tick; the readers queue whatever comes in meanwhile
+            t_tick = ticker.wait()
+        else:
+            # Sleep until either reader thread has something new (or a frame is due)
+            new_data.wait(DRAW_RATE)
+            new_data.clear()
+        t_loop = timer.now()
+
+        # --- A) Multimeter: only the newest reading matters ---
+        meter_samples = meter_reader.drain()
+        de10_batches = de10_reader.drain() if de10_reader else []
+        if raw_capture:
+            for ts, v in meter_samples:
+                capture_raw("meter", ts, v)
+            for ts, batch in de10_batches:
+                capture_raw("de10", ts, batch)
+        if meter_samples:
+            v_meter = meter_samples[-1][1]
+            meter_temp = round(volts_to_tempC(v_meter, CJ_TEMP_C), 1)
+        elif meter_down():
+            meter_temp = float("nan")  # the DE10 path keeps going without the meter
+        t_stage = timer.lap("drain", t_loop)
+
+        # --- B) DE10: apply every batch that came in (temp-lines and ADC0 lines) ---
+        # Only ADC0 lines count as new data: temp-lines are the DE10 echoing what we
+        # sent it, and answering those would just start an echo loop.
+        adc_samples = []
+        for ts, (counts, temps) in de10_batches:
+            if len(temps):
+                last_de10_temp = float(temps[-1])
+                de10_writer.check_echo(temps)  # echoes are checked as they come in, nothing waits for them
+            if len(counts):
+                last_adc0 = int(counts[-1])
+                adc_samples.append(ts)
+
+        if meter_temp is None or not (meter_samples or adc_samples):
+            if de10_writer:
+                de10_writer.poll()  # merged values and the keepalive
+            if not HEADLESS:
+                fig.canvas.flush_events()  # keep the window responsive while idle
+            continue
+
+        # When the newest sample was read (reader timestamp): the latency is timed from here
+        t_sample = max(([meter_samples[-1][0]] if meter_samples else []) + adc_samples[-1:]) - start
+        if ticker:
+            t = ticker.t0 - start_monotonic + t_tick  # evenly spaced
+        else:
+            t = t_sample
+
+        # --- C) + D) Convert ADC0 -> opamp temperature, delta limiter (optional) ---
+        opamp_temp_limited, delta = process_sample(meter_temp, last_adc0)
+        t_stage = timer.lap("kconvert + limiter", t_stage)
+
+        # --- Send chosen temperature to DE10 for LCD/7-seg/FSM ---
+        if ser2:
+            if send_to_de10(meter_temp, opamp_temp_limited):
+                note_write_back()
+                timer.record("sample->write-back", int((time.time() - start - t_sample) * 1e9))
+            t_stage = timer.lap("write-back", t_stage)
+
+        # --- E) Console output ---
+        print(f"{meter_temp:6.1f} {opamp_temp_limited:6.1f} {delta:4.1f}")
+        if csv_writer:
+            csv_writer.writerow([t, meter_temp, opamp_temp_limited, delta])
+        if run_log:
+            run_log.write(t, meter_temp, last_adc0, opamp_temp_limited)
+        t_stage = timer.lap("console + log", t_stage)
+
+        # --- F) Plot update ---
+        if not HEADLESS:
+            plot_update(t, meter_temp, opamp_temp_limited)
+            plot_draw()
+        timer.lap("plot", t_stage)
+        timer.lap("loop", t_loop)
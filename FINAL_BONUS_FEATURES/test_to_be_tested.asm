@@ -424,6 +424,10 @@ SST_SEND_ONES:
 
 SEG_BLANK equ 0FFh
 
+; ADC0 as "A0=HHLL<CR><LF>", or with ADC0_BINARY = 1 as the 5-byte frame
+; A5h, state (fsm_state), HH, LL, NOT(state + HH + LL)
+ADC0_BINARY equ 0
+ADC0_SYNC   equ 0A5h
 
 ADC0_SendLine:
     push acc
@@ -444,6 +448,28 @@ ADC0_SendLine:
     mov r6, ADC_H
     mov r7, ADC_L
 
+    mov a, #ADC0_BINARY
+    jz  ADC0_SEND_ASCII
+
+    ; Binary frame: sync, state, HH, LL, checksum
+    mov a, #ADC0_SYNC
+    lcall putchar
+    mov a, fsm_state
+    anl a, #0Fh
+    mov r5, a
+    lcall putchar
+    mov a, r6
+    lcall putchar
+    mov a, r7
+    lcall putchar
+    mov a, r5
+    add a, r6
+    add a, r7
+    cpl a
+    lcall putchar
+    sjmp ADC0_SEND_DONE
+
+ADC0_SEND_ASCII:
     mov a, #'A'
     lcall putchar
     mov a, #'0'
@@ -461,6 +487,7 @@ ADC0_SendLine:
     mov a, #0Ah
     lcall putchar
 
+ADC0_SEND_DONE:
     pop 7
     pop 6
     pop 5
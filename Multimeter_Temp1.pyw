@@ -12,6 +12,9 @@ import time
 import serial
 import serial.tools.list_ports
 import kconvert
+import portscan
+import serial_reader
+from meter_driver import PipelinedMeter
 
 top = Tk()
 top.resizable(0,0)
@@ -27,6 +30,14 @@ DMM_Name = StringVar()
 connected=0
 global ser
 ser2 = None
+scan = None
+# The serial I/O runs in worker threads (serial_reader.py); the Tk thread only
+# polls their queues, so a slow reply never freezes the window
+meter_reader = None
+board_reader = None
+last_reading = 0.0
+POLL_MS = 50   # how often the window looks for new readings
+STALE_S = 5.0  # no reading for this long = communication lost
    
 def Just_Exit():
     top.destroy()
@@ -35,105 +46,102 @@ def Just_Exit():
     except:
         dummy=0
 
+def read_board():
+    # Runs in the board thread: one line from the DE10Lite (waits up to the port timeout)
+    # Supported formats:
+    #   "175.9,22.1"  (preferred)
+    #   "175.9"       (legacy)
+    # Returns (board_t, board_cj), either may be None, or None for an empty line
+    strin2 = ser2.readline()
+    strin2 = strin2.rstrip()
+    strin2 = strin2.decode()
+    if len(strin2) == 0:
+        return None
+    board_t = None   # oven temperature from DE10Lite (C)
+    board_cj = None  # cold junction temperature from LM335 (C)
+    parts = [p.strip() for p in strin2.split(',')]
+    if len(parts) >= 1:
+        try:
+            board_t = float(parts[0])
+        except:
+            board_t = None
+    if len(parts) >= 2:
+        try:
+            board_cj = float(parts[1])
+        except:
+            board_cj = None
+    return board_t, board_cj
+
+def board_latest():
+    # Newest board sample, or None if nothing came in for STALE_S (DE10 unplugged
+    # or no longer sending), so an old reading is never shown as a live one
+    latest = board_reader.latest() if board_reader is not None else None
+    if latest is None or time.time() - latest[0] > STALE_S:
+        return None
+    return latest[1]
+
+def read_meter(meter):
+    """Runs on the meter thread: the reading and the meter's own text of it, together."""
+    volts = meter.read()
+    return None if volts is None else (volts, meter.text)
+
+def show_temp(volts, text):
+    DMMout.set(text)
+    val=volts*1000.0
+
+    try:
+       cj=float(CJTemp.get()) 
+    except:
+       cj=0.0 
+
+    # Newest board readings, None when there is no live one
+    board_t = None
+    board_cj = None
+    latest = board_latest()
+    if latest is not None:
+        board_t, board_cj = latest
+
+    # If board provides CJ, use it automatically (and show it in the UI)
+    if board_cj is not None:
+        cj = board_cj
+        CJTemp.set(str(round(cj, 1)))
+
+    ktemp=round(kconvert.mV_to_C(val, cj),1)
+    if ktemp < -200:  
+        Temp.set("UNDER")
+    elif ktemp > 1372:
+        Temp.set("OVER")
+    else:
+        Temp.set(ktemp)
+        # Print comparison if board temperature is available
+        if board_t is not None:
+            try:
+                print(ktemp, board_t, round(abs(ktemp-board_t),2))
+            except:
+                dummy=1
+
 def update_temp():
-    global ser, ser2, connected
+    global connected, last_reading
     if connected==0:
-        top.after(5000, FindPort) 
         return
-    try:
-        strin_bytes = ser.readline() 
-        strin=strin_bytes.decode()
-        ser.readline() 
-        if len(strin)>1:
-            if strin[1]=='>': 
-                strin_bytes = ser.readline() 
-                strin = strin_bytes.decode() 
-        ser.write(b"MEAS1?\r\n") 
-    except:
+    if meter_reader.error is not None or time.time() - last_reading > STALE_S:
         connected=0
+        meter_reader.stop()
         DMMout.set("----")
         Temp.set("----")
         portstatus.set("Communication Lost")
         DMM_Name.set ("--------")
-        top.after(5000, FindPort) 
+        top.after(100, FindPort) # the last port is tried first, so a USB glitch costs well under a second
         return
-    strin_clean = strin.replace("VDC","") 
-    if len(strin_clean) > 0:      
-       DMMout.set(strin.replace("\r", "").replace("\n", "")) 
-
-       try:
-           val=float(strin_clean)*1000.0 
-           valid_val=1
-       except:
-           valid_val=0
-
-       try:
-          cj=float(CJTemp.get()) 
-       except:
-          cj=0.0 
-
-       # Board readings from DE10Lite serial (expected line format: "Toven,CJ")
-       board_t = None   # oven temperature from DE10Lite (C)
-       board_cj = None  # cold junction temperature from LM335 (C)
-       
-       # --- MODIFIED SECTION START ---
-       if ser2 is not None:
-           try:
-               # REMOVED: ser2.reset_input_buffer() 
-               # We just read directly now. The timeout handles the wait.
-               strin2 = ser2.readline()
-               strin2 = strin2.rstrip()
-               strin2 = strin2.decode()
-
-               if len(strin2) > 0:
-                   # Supported formats:
-                   #   "175.9,22.1"  (preferred)
-                   #   "175.9"       (legacy)
-                   parts = [p.strip() for p in strin2.split(',')]
-                   if len(parts) >= 1:
-                       try:
-                           board_t = float(parts[0])
-                       except:
-                           board_t = None
-                   if len(parts) >= 2:
-                       try:
-                           board_cj = float(parts[1])
-                       except:
-                           board_cj = None
-           except:
-               board_t = None
-               board_cj = None
-       # --- MODIFIED SECTION END ---
-
-       # If board provides CJ, use it automatically (and show it in the UI)
-       if board_cj is not None:
-           cj = board_cj
-           CJTemp.set(str(round(cj, 1)))
-
-       if valid_val == 1 :
-           ktemp=round(kconvert.mV_to_C(val, cj),1)
-           if ktemp < -200:  
-               Temp.set("UNDER")
-           elif ktemp > 1372:
-               Temp.set("OVER")
-           else:
-               Temp.set(ktemp)
-               # Print comparison if board temperature is available
-               if board_t is not None:
-                   try:
-                       print(ktemp, board_t, round(abs(ktemp-board_t),2))
-                   except:
-                       dummy=1
-       else:
-           Temp.set("----")
-    else:
-       Temp.set("----")
-       connected=0
-    top.after(500, update_temp)
+    samples = meter_reader.drain()
+    if samples:
+        last_reading, (volts, text) = samples[-1] # only the newest reading is shown
+        show_temp(volts, text)
+    top.after(POLL_MS, update_temp)
 
     
 def FindPort():
-   global ser, connected
+   global ser, connected, scan
    try:
        ser.close()
    except:
@@ -141,38 +149,32 @@ def FindPort():
        
    connected=0
    DMM_Name.set ("--------")
-   portlist=list(serial.tools.list_ports.comports())
-   for item in reversed(portlist):
-      portstatus.set("Trying port " + item[0])
-      top.update()
-      try:
-         ser = serial.Serial(item[0], 9600, timeout=0.5)
-         time.sleep(0.2) # for the simulator
-         ser.write(b'\x03') # Request prompt from possible multimeter
-         instr = ser.readline() # Read the prompt "=>"
-         pstring = instr.decode()
-         if len(pstring) > 1:
-            if pstring[1]=='>':
-               ser.timeout=3  # Three seconds timeout to receive data should be enough
-               portstatus.set("Connected to " + item[0])
-               ser.write(b"VDC; RATE S; *IDN?\r\n") # Measure DC voltage, set scan rate to 'Slow' for max resolution, get multimeter ID
-               instr=ser.readline()
-               devicename=instr.decode()
-               DMM_Name.set(devicename.replace("\r", "").replace("\n", ""))
-               ser.readline() # Read and discard the prompt "=>"
-               ser.write(b"MEAS1?\r\n") # Request first value from multimeter
-               connected=1
-               top.after(1000, update_temp)
-               break
-            else:
-               ser.close()
-         else:
-            ser.close()
-      except:
-         connected=0
-   if connected==0:
+   portstatus.set("Looking for the multimeter")
+   # All ports are probed at once, in the background, so the window stays responsive
+   scan = portscan.MeterScan(exclude=[ser2.port] if ser2 is not None else [])
+   scan.start()
+   top.after(20, PortFound)
+
+def PortFound():
+   global ser, connected, meter_reader, last_reading
+   if scan.is_alive():
+      top.after(20, PortFound)
+      return
+   if scan.ser is None:
       portstatus.set("Multimeter not found")
-      top.after(5000, FindPort) # Try again in 5 seconds
+      top.after(1000, FindPort) # Try again in a second (the scan no longer blocks the window)
+      return
+   ser = scan.ser
+   ser.timeout=0.5  # the meter thread waits at most this long per read
+   portstatus.set("Connected to " + ser.port)
+   DMM_Name.set(scan.idn)
+   meter = PipelinedMeter(ser)
+   meter.fill() # the scan already set VDC and read *IDN?: start the MEAS1? queries
+   meter_reader = serial_reader.SerialReader("meter", lambda: read_meter(meter))
+   meter_reader.start()
+   last_reading = time.time()
+   connected=1
+   top.after(POLL_MS, update_temp)
 
 Label(top, text="Cold Junction Temperature:").grid(row=1, column=0)
 Entry(top, bd =1, width=7, textvariable=CJTemp).grid(row=2, column=0)
@@ -199,5 +201,9 @@ except:
    for item in portlist:
       print (item[0])
 
+if ser2 is not None:
+    board_reader = serial_reader.SerialReader("board", read_board)
+    board_reader.start()
+
 top.after(500, FindPort)
 top.mainloop()
@@ -0,0 +1,168 @@
+"""
+acq_engine.py: asyncio acquisition engine for the reflow oven scripts.
+
+The blocking loops in the acquisition scripts do serial I/O, conversion, the
+DE10 write-back and plotting one after the other, so the slowest step sets the
+pace for all of them. Here every stage is its own coroutine:
+
+  sources     one per serial device. pyserial has no asyncio support, so each
+              source runs the device's blocking read function in a
+              serial_reader.SerialReader thread and hands the samples to the
+              event loop.
+  transforms  turn samples into results (kconvert, delta limiter, ...).
+  sinks       consume results (DE10 write-back, CSV, console, plot).
+
+Stages are connected with Broadcast channels. Each subscriber has its own
+bounded queue. When a queue is full the oldest item is dropped, so a slow sink
+only ever falls behind on itself. A write-back sink with maxsize=1 always gets
+the newest temperature, so the delay from a meter reading to the write-back is
+one transform call, whatever the plot is doing.
+
+To use in your Python program:
+
+import asyncio
+import acq_engine
+
+async def main():
+    engine = acq_engine.AcquisitionEngine()
+    raw = acq_engine.Broadcast()
+    engine.source("meter", lambda: read_meter_vdc(ser), raw)
+    temps = engine.transform(raw, lambda item: kconvert.mV_to_C(item[2] * 1000.0, 22.0))
+    engine.sink(temps, lambda temp: ser2.write(f"{temp:.1f}\\n".encode()), blocking=True)
+    engine.every(0.05, redraw)
+    await engine.run()
+
+asyncio.run(main())
+
+"""
+import asyncio
+
+import serial_reader
+from ticker import Ticker
+
+class Broadcast:
+    """Fan-out channel: every subscriber gets its own copy of each published item."""
+    def __init__(self):
+        self.subscribers = []
+
+    def subscribe(self, maxsize=1):
+        q = asyncio.Queue(maxsize)
+        self.subscribers.append(q)
+        return q
+
+    def publish(self, item):
+        for q in self.subscribers:
+            if q.full():
+                q.get_nowait()  # drop the oldest, the newest value is the one that matters
+            q.put_nowait(item)
+
+class LoopWake:
+    """Lets a reader thread wake an asyncio.Event owned by the event loop."""
+    def __init__(self, loop, event):
+        self.loop = loop
+        self.event = event
+
+    def set(self):
+        self.loop.call_soon_threadsafe(self.event.set)
+
+class AsyncSerialStream:
+    """
+    Async view of a blocking read function. The reads happen in a
+    serial_reader.SerialReader thread; read_batch() waits until the thread has
+    something and returns all of it as (timestamp, sample) pairs.
+    """
+    def __init__(self, name, read_func, maxlen=4096):
+        self.event = asyncio.Event()
+        wake = LoopWake(asyncio.get_running_loop(), self.event)
+        self.reader = serial_reader.SerialReader(name, read_func, maxlen=maxlen, wake=wake)
+
+    def start(self):
+        self.reader.start()
+
+    def stop(self):
+        self.reader.stop()
+
+    async def read_batch(self):
+        while True:
+            self.event.clear()
+            batch = self.reader.drain()
+            if batch:
+                return batch
+            await self.event.wait()
+
+class AcquisitionEngine:
+    """
+    Collects the stages of a pipeline and runs them as concurrent tasks.
+    Create it (and call its methods) from inside a coroutine.
+    """
+    def __init__(self):
+        self.streams = []
+        self.coros = []
+
+    def source(self, name, read_func, out):
+        """Publishes (name, timestamp, sample) on out for every sample read_func() returns."""
+        stream = AsyncSerialStream(name, read_func)
+        self.streams.append(stream)
+
+        async def run():
+            while True:
+                for ts, sample in await stream.read_batch():
+                    out.publish((name, ts, sample))
+        self.coros.append(run())
+        return out
+
+    def transform(self, inp, func, maxsize=4096):
+        """
+        Runs func on every item of inp and publishes the results that are not None.
+        The input queue is deep so that no sample is dropped before conversion.
+        """
+        q = inp.subscribe(maxsize)
+        out = Broadcast()
+
+        async def run():
+            while True:
+                result = func(await q.get())
+                if result is not None:
+                    out.publish(result)
+        self.coros.append(run())
+        return out
+
+    def sink(self, inp, func, maxsize=1, blocking=False):
+        """
+        Calls func for the items of inp. With the default maxsize=1 the sink only
+        sees the newest item. blocking=True runs func in the default executor so
+        a blocking call (for example a serial write) does not hold up the loop.
+        """
+        q = inp.subscribe(maxsize)
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            while True:
+                item = await q.get()
+                if blocking:
+                    await loop.run_in_executor(None, func, item)
+                else:
+                    func(item)
+        self.coros.append(run())
+
+    def every(self, period, func):
+        """
+        Calls func() every period seconds (for example to redraw a plot), on a
+        fixed grid of deadlines (ticker.py). Returns the Ticker, for its overrun counts.
+        """
+        ticker = Ticker(period)
+        async def run():
+            while True:
+                await ticker.wait_async()
+                func()
+        self.coros.append(run())
+        return ticker
+
+    async def run(self):
+        for stream in self.streams:
+            stream.start()
+        try:
+            await asyncio.gather(*self.coros)
+        finally:
+            for stream in self.streams:
+                stream.stop()
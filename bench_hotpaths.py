@@ -0,0 +1,246 @@
+"""
+bench_hotpaths.py: Benchmarks for the hot paths of the acquisition loop.
+
+Times, in ns per operation and samples per second:
+  - kconvert.mV_to_C / C_to_mV, one value at a time and on arrays
+  - read_de10_stream() parsing "A0=HHLL" and temperature lines (A0_RE), and
+    the bulk DE10StreamParser / DE10FrameParser on a 1000-sample read
+  - adc_counts_to_volts() -> opamp_volts_to_tempC()
+  - apply_delta_limiter()
+  - one plot frame (plot_update() + plot_draw()) with 1k, 10k and 100k
+    samples in the plot buffer, drawn off-screen with the Agg backend
+  - startup: from starting final_python.py (--headless, and with the plot on
+    the Agg backend) to its first write-back reaching the simulated DE10, with
+    sim_devices.py standing in for the meter and the DE10
+
+Every benchmark runs for at least MIN_TIME seconds, REPEAT times, and the best
+repeat is kept.  The results are compared against bench_baseline.json and any
+benchmark more than TOLERANCE times slower than its baseline is reported as a
+regression (exit status 1), so run it before a reflow run, not during one.
+The baseline is only meaningful on the machine it was saved on: after changing
+machines, or after a deliberate speed-up, save a new one with --save.
+
+python bench_hotpaths.py                  # run and compare against the baseline
+python bench_hotpaths.py --save           # run and save as the new baseline
+python bench_hotpaths.py -k plot          # only the benchmarks with "plot" in their name
+
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import matplotlib
+matplotlib.use("Agg")  # off-screen: the frame benchmarks must not open a window
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "FINAL_BONUS_FEATURES"))
+
+import kconvert
+import final_python
+from de10_stream import DE10StreamParser, DE10FrameParser, make_frame
+
+BASELINE_FILE = os.path.join(HERE, "bench_baseline.json")
+MIN_TIME = 0.2    # seconds per repeat
+REPEAT = 5
+STARTUP_TIMEOUT = 30.0  # seconds to wait for the first write-back
+TOLERANCE = 1.5   # slower than baseline * TOLERANCE = regression
+ARRAY_SIZE = 1000
+PLOT_SIZES = (1000, 10000, 100000)
+
+# ============================================================
+# TIMING
+# ============================================================
+
+def timeit(func, samples_per_call=1, min_time=MIN_TIME, repeat=REPEAT):
+    """Best-of-repeat time of func() as (ns per sample, samples per second)."""
+    # Find a number of calls that takes about min_time
+    calls = 1
+    while True:
+        t0 = time.perf_counter_ns()
+        for _ in range(calls):
+            func()
+        elapsed = time.perf_counter_ns() - t0
+        if elapsed >= min_time * 1e9:
+            break
+        calls *= 2 if elapsed == 0 else max(2, min(10, int(min_time * 1e9 / elapsed) + 1))
+    best = elapsed
+    for _ in range(repeat - 1):
+        t0 = time.perf_counter_ns()
+        for _ in range(calls):
+            func()
+        best = min(best, time.perf_counter_ns() - t0)
+    ns = best / (calls * samples_per_call)
+    return ns, 1e9 / ns
+
+class FakeSerial:
+    """Stands in for the DE10 port: readline() cycles through the given lines."""
+    def __init__(self, lines):
+        self.lines = lines
+        self.i = 0
+
+    def readline(self):
+        line = self.lines[self.i]
+        self.i = (self.i + 1) % len(self.lines)
+        return line
+
+# ============================================================
+# BENCHMARKS
+# ============================================================
+# Each one yields (name, setup, samples per call): setup() prepares the data
+# and returns the function to time, so skipped benchmarks cost nothing.
+
+def ready(func):
+    """setup() for a benchmark whose data is already prepared."""
+    return lambda: func
+
+def bench_kconvert_scalar():
+    mv = [0.5 + i * 0.05 for i in range(200)]    # about 12..260 C
+    temps = [20.0 + i * 1.2 for i in range(200)]
+    yield "kconvert.mV_to_C scalar", ready(lambda: [kconvert.mV_to_C(v, 21.2) for v in mv]), len(mv)
+    yield "kconvert.C_to_mV scalar", ready(lambda: [kconvert.C_to_mV(t) for t in temps]), len(temps)
+
+def bench_kconvert_array():
+    mv = np.linspace(-5.0, 50.0, ARRAY_SIZE)
+    temps = np.linspace(-100.0, 1200.0, ARRAY_SIZE)
+    yield "kconvert.mV_to_C_array", ready(lambda: kconvert.mV_to_C_array(mv, 21.2)), ARRAY_SIZE
+    yield "kconvert.C_to_mV_array", ready(lambda: kconvert.C_to_mV_array(temps)), ARRAY_SIZE
+
+def bench_de10_parse():
+    adc = FakeSerial([b"A0=%04X\r\n" % (i * 37 % 4096) for i in range(64)])
+    yield "read_de10_stream A0 line", ready(lambda: final_python.read_de10_stream(adc, 0.0, 0)), 1
+    temp = FakeSerial([b"%d.%d\r\n" % (20 + i, i % 10) for i in range(64)])
+    yield "read_de10_stream temp line", ready(lambda: final_python.read_de10_stream(temp, 0.0, 0)), 1
+    # One read's worth of frames, with an echo every 10 lines, split mid-frame
+    chunk = b"".join(b"%d.%d\r\n" % (100 + i, i % 10) if i % 10 == 9 else b"A0=%04X\r\n" % (i * 37 % 4096)
+                     for i in range(1000)) + b"A0=0"
+    parser = DE10StreamParser()
+    yield "DE10StreamParser.feed 1000 lines", ready(lambda: parser.feed(chunk)), 1000
+    frames = b"".join(b"%d.%d\r\n" % (100 + i, i % 10) if i % 10 == 9 else make_frame(i * 37 % 4096, 2)
+                      for i in range(1000)) + make_frame(0x123)[:2]
+    frame_parser = DE10FrameParser()
+    yield "DE10FrameParser.feed 1000 frames", ready(lambda: frame_parser.feed(frames)), 1000
+
+def bench_adc_to_temp():
+    counts = [i * 37 % 4096 for i in range(200)]
+    fp = final_python
+    yield ("adc_counts_to_volts -> opamp_volts_to_tempC",
+           ready(lambda: [fp.opamp_volts_to_tempC(fp.adc_counts_to_volts(c), 21.2) for c in counts]), len(counts))
+
+def bench_delta_limiter():
+    pairs = [(100.0 + i * 0.1, 100.0 + i * 0.1 + (i % 7 - 3)) for i in range(200)]  # in and out of limit
+    yield "apply_delta_limiter", ready(lambda: [final_python.apply_delta_limiter(k, o) for k, o in pairs]), len(pairs)
+
+def bench_plot_frame():
+    fp = final_python
+
+    def setup(size):
+        if hasattr(fp, "plt"):  # imported by the first setup_plot()
+            fp.plt.close("all")
+        fp.PLOT_BUFFER_SIZE = size
+        fp.setup_plot()
+        # A full buffer, all of it inside the visible window
+        t = np.linspace(0.0, fp.FINAL_WINDOW - 1.0, size)
+        temps = 25.0 + 200.0 * np.sin(t / fp.FINAL_WINDOW * np.pi)
+        for ti, temp in zip(t, temps):
+            fp.plot_update(ti, temp, temp + 0.5)
+        fp.last_draw = 0.0
+        fp.plot_draw()  # first (full) draw caches the blit background
+        state = {"t": t[-1]}
+
+        def frame():
+            state["t"] += 1e-3
+            fp.plot_update(state["t"], 200.0, 200.5)
+            fp.last_draw = 0.0  # defeat DRAW_RATE: every call draws
+            fp.plot_draw()
+        return frame
+
+    for size in PLOT_SIZES:
+        yield f"plot frame {size // 1000}k samples", lambda size=size: setup(size), 1
+
+def bench_startup():
+    import sim_devices
+
+    def setup(args, env):
+        dmm = sim_devices.SimDMM(meas_delay=0.05)
+        de10 = sim_devices.SimDE10(rate=20.0)
+        dmm.start()
+        de10.start()
+        cmd = [sys.executable, os.path.join(HERE, "FINAL_BONUS_FEATURES", "final_python.py"),
+               "--meter-port", dmm.port, "--de10-port", de10.port] + args
+        env = dict(os.environ, PYTHONPATH=HERE, **env)
+
+        def start():
+            received = de10.received
+            proc = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            deadline = time.monotonic() + STARTUP_TIMEOUT
+            while de10.received == received:
+                if proc.poll() is not None or time.monotonic() > deadline:
+                    proc.kill()
+                    raise RuntimeError("final_python.py did not write back to the DE10: " + " ".join(cmd))
+                time.sleep(0.001)
+            proc.kill()  # SIGKILL: no exit handlers, so only the startup is timed
+            proc.wait()
+        return start
+
+    yield "startup to first write-back --headless", lambda: setup(["--headless"], {}), 1
+    yield "startup to first write-back with plot", lambda: setup([], {"MPLBACKEND": "Agg"}), 1
+
+BENCHMARKS = (bench_kconvert_scalar, bench_kconvert_array, bench_de10_parse,
+              bench_adc_to_temp, bench_delta_limiter, bench_plot_frame, bench_startup)
+
+# ============================================================
+# MAIN
+# ============================================================
+
+def load_baseline():
+    try:
+        with open(BASELINE_FILE) as f:
+            return json.load(f)["ns_per_op"]
+    except (OSError, ValueError, KeyError):
+        return {}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for the acquisition hot paths")
+    parser.add_argument("--save", action="store_true", help="save the results as the new baseline")
+    parser.add_argument("-k", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="slowdown factor over the baseline that counts as a regression")
+    args = parser.parse_args()
+
+    baseline = load_baseline()
+    results = {}
+    regressions = []
+    print(f"{'benchmark':45s} {'ns/op':>12s} {'samples/s':>12s} {'baseline':>10s}")
+    for bench in BENCHMARKS:
+        for name, setup, samples in bench():
+            if args.k not in name:
+                continue
+            ns, rate = timeit(setup(), samples)
+            results[name] = round(ns, 1)
+            base = baseline.get(name)
+            ratio = f"{ns / base:9.2f}x" if base else "         -"
+            flag = ""
+            if base and ns > base * args.tolerance:
+                regressions.append(name)
+                flag = "  REGRESSION"
+            print(f"{name:45s} {ns:12.1f} {rate:12.0f} {ratio}{flag}")
+
+    if args.save:
+        baseline.update(results)
+        with open(BASELINE_FILE, "w") as f:
+            json.dump({"machine": f"{sys.platform} python {sys.version.split()[0]} numpy {np.__version__}",
+                       "ns_per_op": baseline}, f, indent=2)
+            f.write("\n")
+        print(f"Baseline saved to {BASELINE_FILE}")
+    elif regressions:
+        print(f"{len(regressions)} regression(s) over {args.tolerance}x the baseline:", ", ".join(regressions))
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+csvlog.py: Buffered CSV logging sink for the serial logging scripts.
+
+Opening the file and creating a csv.writer for every line costs an open/close
+pair per sample, and at 115200 baud that is enough to fall behind the stream.
+CSVLogger keeps the file open, collects rows in memory and writes them out
+when FLUSH_ROWS rows are waiting or FLUSH_SECS seconds have passed, whichever
+comes first, and again on close().  close() also runs at interpreter exit, so
+Ctrl+C does not lose the last rows.
+
+fsync controls how hard each flush goes to disk:
+  "never"  leave it to the OS (fastest, may lose the last seconds on power loss)
+  "flush"  os.fsync() after every flush
+  "close"  os.fsync() once, when the file is closed
+
+To use in your Python program:
+
+from csvlog import CSVLogger
+
+with CSVLogger("thermocouple_data.csv", ["Timestamp", "Temperature (C)"]) as log:
+    while True:
+        log.writerow([timestamp, line])
+        log.poll()  # call when idle too, so the time threshold still applies
+
+"""
+import atexit
+import csv
+import os
+import time
+
+FLUSH_ROWS = 256
+FLUSH_SECS = 1.0
+
+class CSVLogger:
+    def __init__(self, filename, header=None, flush_rows=FLUSH_ROWS, flush_secs=FLUSH_SECS,
+                 fsync="never", mode="w"):
+        if fsync not in ("never", "flush", "close"):
+            raise ValueError(f"fsync must be 'never', 'flush' or 'close', not {fsync!r}")
+        self.file = open(filename, mode, newline="")
+        self.writer = csv.writer(self.file)
+        self.flush_rows = flush_rows
+        self.flush_secs = flush_secs
+        self.fsync = fsync
+        self.rows = []
+        self.last_flush = time.monotonic()
+        if header:
+            self.writer.writerow(header)
+        atexit.register(self.close)
+
+    def writerow(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.flush_rows:
+            self.flush()
+        else:
+            self.poll()
+
+    def poll(self):
+        """Flushes if rows have been waiting longer than flush_secs."""
+        if self.rows and time.monotonic() - self.last_flush >= self.flush_secs:
+            self.flush()
+
+    def flush(self):
+        if self.file.closed:
+            return
+        self.writer.writerows(self.rows)
+        self.rows = []
+        self.file.flush()
+        if self.fsync == "flush":
+            os.fsync(self.file.fileno())
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.flush()
+        if self.fsync == "close":
+            os.fsync(self.file.fileno())
+        self.file.close()
+        atexit.unregister(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
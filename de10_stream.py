@@ -0,0 +1,239 @@
+"""
+de10_stream.py: Bulk parser for the DE10 serial stream.
+
+The DE10 sends "A0=HHLL\\r\\n" lines (ADC0 counts, hex) and echoes every
+temperature it is sent as "ddd.d\\r\\n".  Reading that one readline() at a time
+costs a read, a decode, a strip and a regex match per line in Python, and once
+the DE10 sends faster than the loop reads, the OS buffer grows and every value
+the loop sees is stale.
+
+DE10StreamParser instead reads everything waiting on the port in one call into
+a bytearray that is kept between calls, so a line cut in half by a read is
+completed by the next one.  The complete lines are matched with one findall()
+per line type, directly on the bytearray, and all the A0 frames are turned
+into counts in one step (bytes.fromhex() + np.frombuffer()), so there is no
+Python code per character or per frame.  Lines that are neither (corrupted or
+cut short) are counted in .bad and skipped.
+
+DE10FrameParser is for firmware assembled with ADC0_BINARY = 1, which sends
+ADC0 as a 5-byte binary frame instead of the 9-byte "A0=HHLL\r\n" line:
+
+  A5h     sync
+  state   channel (high nibble, 0 = ADC0) | fsm_state (low nibble)
+  HH LL   raw ADC0 counts, big-endian (12-bit, so HH <= 0Fh)
+  check   NOT(state + HH + LL), so the last four bytes add up to FFh
+
+The frames are found with NumPy: every A5h whose next four bytes have the
+right checksum and HH <= 0Fh starts a frame, unless it falls inside the
+last frame that was kept (the check byte itself is A5h whenever state + HH +
+LL = 5Ah, and then the next frame's first four bytes check out after it).
+A frame hit by a dropped or changed byte fails the checksum and the parser
+picks up again at the next good sync byte, so it resyncs by itself.
+Everything that is not a frame (the temperature echoes are still ASCII
+lines) goes to the line parser above, with a line end where each frame was,
+so it also reads ASCII firmware.
+
+To use in your Python program:
+
+from de10_stream import DE10StreamParser, DE10FrameParser
+
+parser = DE10StreamParser()            # or DE10FrameParser() for binary frames
+while True:
+    counts, temps = parser.read(ser2)  # every new sample, oldest first (NumPy arrays)
+    print(parser.counts, parser.temp)  # newest ADC0 counts and echoed temperature so far
+    print(parser.state)                # DE10FrameParser only: newest fsm_state
+
+"""
+import math
+import re
+
+import numpy as np
+
+# Same frames read_de10_stream() accepts, one per line
+A0_FRAME = re.compile(rb"^[ \t]*A0[ \t]*=[ \t]*([0-9A-Fa-f]{4})[ \t\r]*$", re.M)
+# (a temperature is any float() token: sign, exponent, inf and nan included)
+TEMP_FRAME = re.compile(rb"^[ \t]*([-+]?(?:(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][-+]?[0-9]+)?"
+                        rb"|(?i:inf(?:inity)?|nan)))[ \t\r]*$", re.M)
+NONBLANK_LINE = re.compile(rb"\S[^\n]*\n")
+MAX_PARTIAL = 256  # bytes without a line end before the carry-over is thrown away
+
+NO_COUNTS = np.zeros(0, dtype=np.uint16)
+NO_TEMPS = np.zeros(0)
+
+FRAME_SYNC = 0xA5
+FRAME_SIZE = 5
+
+class DE10StreamParser:
+    def __init__(self):
+        self.buf = bytearray()  # unparsed bytes: the start of a line still coming in
+        self.counts = None      # newest ADC0 counts
+        self.temp = None        # newest temperature echo
+        self.frames = 0         # A0 frames decoded so far
+        self.bad = 0            # lines that were neither an A0 frame nor a temperature
+
+    def read(self, ser):
+        """
+        Reads everything waiting on ser (waiting up to the port timeout when
+        nothing is) and returns feed()'s (counts, temps).
+        """
+        waiting = ser.in_waiting
+        data = ser.read(waiting or 1)
+        if not waiting and data:
+            data += ser.read(ser.in_waiting)
+        return self.feed(data)
+
+    def feed(self, data):
+        """
+        Adds raw bytes from the port. Returns (counts, temps): NumPy arrays of
+        the ADC0 counts and the temperatures of every line completed by data,
+        oldest first (empty arrays when there are none).
+        """
+        buf = self.buf
+        buf += data
+        end = buf.rfind(b"\n") + 1
+        if end == 0:
+            if len(buf) > MAX_PARTIAL:
+                self.bad += 1
+                del buf[:]
+            return NO_COUNTS, NO_TEMPS
+
+        hexes = A0_FRAME.findall(buf, 0, end)
+        temps = TEMP_FRAME.findall(buf, 0, end)
+        lines = len(NONBLANK_LINE.findall(buf, 0, end))
+        del buf[:end]  # keep only the partial line
+
+        self.bad += max(0, lines - len(hexes) - len(temps))
+        if hexes:
+            counts = np.frombuffer(bytes.fromhex(b"".join(hexes).decode("ascii")), dtype=">u2")
+            self.counts = int(counts[-1])
+            self.frames += len(counts)
+        else:
+            counts = NO_COUNTS
+        if temps:
+            temps = np.array(temps).astype(float)
+            self.temp = float(temps[-1])
+        else:
+            temps = NO_TEMPS
+        return counts, temps
+
+class DE10FrameParser(DE10StreamParser):
+    def __init__(self):
+        DE10StreamParser.__init__(self)
+        self.raw = bytearray()  # bytes not yet split into frames and text
+        self.state = None       # newest fsm_state
+        self.states = np.zeros(0, dtype=np.uint8)  # fsm_state of each frame of the last feed()
+
+    def feed(self, data):
+        """Same as DE10StreamParser.feed(), for a stream of binary frames and ASCII lines."""
+        raw = self.raw
+        raw += data
+        arr = np.frombuffer(raw, dtype=np.uint8)
+        n = len(arr)
+
+        # Candidate frames: a sync byte with four more bytes after it that check out
+        starts = np.flatnonzero(arr[:max(n - FRAME_SIZE + 1, 0)] == FRAME_SYNC)
+        body = arr[starts[:, None] + np.arange(1, FRAME_SIZE)].astype(np.uint16)
+        ok = (body.sum(axis=1) & 0xFF == 0xFF) & (body[:, 1] <= 0x0F)
+        starts, body = starts[ok], body[ok]
+        # A sync byte inside the last frame kept is payload, not a new frame.
+        # Candidates only overlap when a payload byte is A5h, so the walk
+        # against the last kept frame is only done then.
+        if len(starts) > 1 and np.any(np.diff(starts) < FRAME_SIZE):
+            keep = np.ones(len(starts), dtype=bool)
+            last = -FRAME_SIZE
+            for i, start in enumerate(starts.tolist()):
+                if start - last < FRAME_SIZE:
+                    keep[i] = False
+                else:
+                    last = start
+            starts, body = starts[keep], body[keep]
+
+        # Hold back a sync byte near the end: its frame may not be complete yet
+        tail = np.flatnonzero(arr[max(n - FRAME_SIZE + 1, 0):] == FRAME_SYNC)
+        end = max(n - FRAME_SIZE + 1, 0) + tail[0] if len(tail) else n
+        if len(starts):
+            end = max(end, starts[-1] + FRAME_SIZE)
+
+        # The rest is ASCII text for the line parser. Each frame becomes a line
+        # end, so bytes left over from a broken frame don't spoil the next line.
+        text = arr[:end].copy()
+        text[starts] = ord("\n")
+        keep = np.ones(end, dtype=bool)
+        keep[(starts[:, None] + np.arange(1, FRAME_SIZE)).ravel()] = False
+        text_bytes = text[keep].tobytes()
+        del arr
+        del raw[:end]
+        line_counts, temps = DE10StreamParser.feed(self, text_bytes)
+
+        if len(starts):
+            counts = (body[:, 1] << 8) | body[:, 2]
+            self.states = (body[:, 0] & 0x0F).astype(np.uint8)
+            self.state = int(self.states[-1])
+            self.counts = int(counts[-1])
+            self.frames += len(counts)
+            if len(line_counts):
+                counts = np.concatenate((line_counts, counts))
+        else:
+            counts = line_counts
+            self.states = self.states[:0]
+        return counts, temps
+
+def make_frame(counts, state=0):
+    """One binary ADC0 frame, as the firmware sends it with ADC0_BINARY = 1."""
+    hh, ll = (counts >> 8) & 0xFF, counts & 0xFF
+    return bytes((FRAME_SYNC, state, hh, ll, ~(state + hh + ll) & 0xFF))
+
+if __name__ == '__main__':
+    # Self-test: frames split across reads, corrupted lines and both line types
+    parser = DE10StreamParser()
+    stream = (b"A0=0123\r\nA0=0FFF\r\n25.3\r\nA0=01\r\nA0=0AbC\r\n\r\nxx\r\n131.0\r\n"
+              b"A0=0800\r\nA0=07")
+    got_counts, got_temps = [], []
+    for i in range(0, len(stream), 5):
+        counts, temps = parser.feed(stream[i:i + 5])
+        got_counts += counts.tolist()
+        got_temps += temps.tolist()
+    print("counts:", got_counts, "temps:", got_temps, "bad:", parser.bad,
+          "carried:", bytes(parser.buf))
+    assert got_counts == [0x123, 0xFFF, 0xABC, 0x800]
+    assert got_temps == [25.3, 131.0]
+    assert parser.bad == 2 and bytes(parser.buf) == b"A0=07"
+    assert parser.counts == 0x800 and parser.temp == 131.0
+
+    # Echoes in any form float() reads; a unit, a second point or a bare sign is rejected
+    parser = DE10StreamParser()
+    counts, temps = parser.feed(b"+25\r\n.5\r\n-1.5e2\r\n2E1\r\n -inf \r\n25.3C\r\n1.2.3\r\n-\r\n")
+    print("temps:", temps.tolist(), "bad:", parser.bad)
+    assert temps.tolist() == [25.0, 0.5, -150.0, 20.0, -math.inf] and parser.bad == 3
+
+    # Binary frames with echoes in between, a frame with a dropped byte, a
+    # frame with a changed byte and payload bytes that look like sync bytes
+    parser = DE10FrameParser()
+    stream = (make_frame(0x123, 1) + make_frame(0x0A5, 1) + b"25.3\r\n" + make_frame(0xA5A)[:3]
+              + make_frame(0xFFF, 2) + make_frame(0x456, 2)[:4] + b"\x00" + make_frame(0x7A5, 3)
+              + b"131.0\r\n" + make_frame(0x800, 4) + make_frame(0x801, 4)[:2])
+    got_counts, got_temps, got_states = [], [], []
+    for i in range(0, len(stream), 3):
+        counts, temps = parser.feed(stream[i:i + 3])
+        got_counts += counts.tolist()
+        got_temps += temps.tolist()
+        got_states += parser.states.tolist()
+    print("counts:", [hex(c) for c in got_counts], "states:", got_states, "temps:", got_temps,
+          "bad:", parser.bad, "carried:", bytes(parser.raw))
+    assert got_counts == [0x123, 0x0A5, 0xFFF, 0x7A5, 0x800]
+    assert got_states == [1, 1, 2, 3, 4] and parser.state == 4
+    assert got_temps == [25.3, 131.0]
+    assert bytes(parser.raw) == make_frame(0x801, 4)[:2]
+
+    # A steady reading whose check byte is A5h (state + HH + LL = 5Ah): the
+    # check byte and the next frame's first four bytes look like a frame too
+    stream = make_frame(0x059, 1) * 10
+    assert stream[FRAME_SIZE - 1] == FRAME_SYNC
+    for size in (len(stream), 7, 3):
+        parser = DE10FrameParser()
+        got_counts = []
+        for i in range(0, len(stream), size):
+            got_counts += parser.feed(stream[i:i + size])[0].tolist()
+        assert got_counts == [0x059] * 10, (size, got_counts)
+    print("steady A5h check byte: 10 of 10 frames in one read and in 7- and 3-byte reads")
+    print("OK")
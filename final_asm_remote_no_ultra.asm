@@ -574,8 +574,15 @@ SEG_BLANK equ 0FFh
 ; =====================================================
 ; ADC0 -> UART (added)
 ; Reads ADC channel 0 (op-amp output) and prints:
-;   A0=HHLL<CR><LF>   (hex)
+;   A0=HHLL<CR><LF>   (hex, 9 bytes)
+; or, with ADC0_BINARY = 1, sends a 5-byte binary frame:
+;   A5h, state, HH, LL, checksum
+;   state    = channel (high nibble, 0) | fsm_state (low nibble)
+;   checksum = NOT(state + HH + LL), so state+HH+LL+checksum = FFh
+; Set DE10_BINARY_FRAMES = True in the Python script to match.
 ; =====================================================
+ADC0_BINARY equ 0
+ADC0_SYNC   equ 0A5h
 
 ADC0_SendLine:
     push acc
@@ -597,6 +604,28 @@ ADC0_SendLine:
     mov r6, ADC_H
     mov r7, ADC_L
 
+    mov a, #ADC0_BINARY
+    jz  ADC0_SEND_ASCII
+
+    ; Binary frame: sync, state, HH, LL, checksum
+    mov a, #ADC0_SYNC
+    lcall putchar
+    mov a, fsm_state
+    anl a, #0Fh
+    mov r5, a
+    lcall putchar
+    mov a, r6
+    lcall putchar
+    mov a, r7
+    lcall putchar
+    mov a, r5
+    add a, r6
+    add a, r7
+    cpl a
+    lcall putchar
+    sjmp ADC0_SEND_DONE
+
+ADC0_SEND_ASCII:
     ; "A0="
     mov a, #'A'
     lcall putchar
@@ -618,6 +647,7 @@ ADC0_SendLine:
     mov a, #0Ah
     lcall putchar
 
+ADC0_SEND_DONE:
     pop 7
     pop 6
     pop 5
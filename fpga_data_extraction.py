@@ -1,15 +1,19 @@
 import serial
-import csv
 from datetime import datetime
+from csvlog import CSVLogger
 
 # MATCH THE ASM BAUD RATE
 serial_port = 'COM5' # Change to your port
 baud_rate = 115200 
 csv_filename = "thermocouple_data.csv"
 
-with open(csv_filename, mode='w', newline='') as file:
-    writer = csv.writer(file)
-    writer.writerow(["Timestamp", "Temperature (C)"])
+# Rows are buffered and written every FLUSH_ROWS lines or FLUSH_SECS seconds
+FLUSH_ROWS = 256
+FLUSH_SECS = 1.0
+FSYNC = "never" # "never", "flush" (fsync every flush) or "close"
+
+log = CSVLogger(csv_filename, ["Timestamp", "Temperature (C)"],
+                flush_rows=FLUSH_ROWS, flush_secs=FLUSH_SECS, fsync=FSYNC)
 
 try:
     ser = serial.Serial(serial_port, baud_rate, timeout=1)
@@ -19,7 +23,10 @@ try:
         if line:
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             print(f"{timestamp} -> {line}")
-            with open(csv_filename, mode='a', newline='') as file:
-                csv.writer(file).writerow([timestamp, line])
+            log.writerow([timestamp, line])
+        else:
+            log.poll()
 except KeyboardInterrupt:
-    print("Logging stopped.")
\ No newline at end of file
+    print("Logging stopped.")
+finally:
+    log.close()
\ No newline at end of file
@@ -13,6 +13,10 @@ import time
 import serial
 import serial.tools.list_ports
 import kconvert
+from stagetimer import StageTimer
+import portscan
+from de10_stream import DE10StreamParser
+from writeback import WriteBack
 
 top = Tk()
 top.resizable(0,0)
@@ -27,9 +31,20 @@ portstatus = StringVar()
 DMM_Name = StringVar()
 connected=0
 global ser
+ser2 = None
+scan = None
+de10_writer = None   # sends the temperature only when it changed (or as a keepalive), see writeback.py
+de10_echo = DE10StreamParser()
+
+# Per-stage latency stats: printed at exit, on SIGUSR1/Ctrl+Break or with F12
+timer = StageTimer(enabled=True)
+timer.dump_on_exit()
+timer.dump_on_signal()
     
 def Just_Exit():
     top.destroy()
+    if de10_writer is not None:
+        print(de10_writer.report())
     try:
         ser.close()
     except:
@@ -40,6 +55,7 @@ def update_temp():
     if connected==0:
         top.after(5000, FindPort) 
         return
+    t_loop = timer.now()
     try:
         strin_bytes = ser.readline() 
         strin=strin_bytes.decode()
@@ -49,13 +65,14 @@ def update_temp():
                 strin_bytes = ser.readline() 
                 strin = strin_bytes.decode() 
         ser.write(b"MEAS1?\r\n") 
+        t_sample = t_stage = timer.lap("meter read", t_loop)
     except:
         connected=0
         DMMout.set("----")
         Temp.set("----");
         portstatus.set("Communication Lost")
         DMM_Name.set ("--------")
-        top.after(5000, FindPort) 
+        top.after(100, FindPort) 
         return
     strin_clean = strin.replace("VDC","") 
     if len(strin_clean) > 0:      
@@ -74,25 +91,27 @@ def update_temp():
 
        if valid_val == 1 :
            ktemp=round(kconvert.mV_to_C(val, cj),1)
+           t_stage = timer.lap("kconvert", t_stage)
            
            # Send temperature to the DE10-Lite (CV-8052) so the FPGA uses the
            # multimeter reading as its "current temp".
            # We send temperature with 1 decimal place (matches the CV-8052 UART parser).
            try:
-               ser2.write(f"{ktemp:.1f}\r\n".encode())
+               if de10_writer.submit(ktemp):
+                   timer.record("sample->write-back", timer.now() - t_sample)
            except:
                dummy = 1
+           t_stage = timer.lap("write-back", t_stage)
 
-           # Optional: read back the DE10's echoed temperature (for debug)
-           val2 = 0.0
+           # Optional: the DE10's echoed temperature (for debug). Only what has
+           # already come in is read; the echoes are matched in the background.
            try:
-               strin2 = ser2.readline()
-               strin2 = strin2.rstrip()
-               strin2 = strin2.decode()
-               if len(strin2) > 0:
-                   val2 = float(strin2)
+               counts, temps = de10_echo.feed(ser2.read(ser2.in_waiting))
+               de10_writer.check_echo(temps)
            except:
-               val2 = 0.0
+               dummy = 1
+           val2 = de10_echo.temp if de10_echo.temp is not None else 0.0
+           t_stage = timer.lap("echo read", t_stage)
 
            if ktemp < -200:  
                Temp.set("UNDER")
@@ -104,15 +123,17 @@ def update_temp():
                   print(f"{ktemp:.1f} {val2:.1f} {abs(ktemp-val2):.1f}")
                except:
                   dummy=1
+           timer.lap("display", t_stage)
        else:
            Temp.set("----");
     else:
        Temp.set("----");
        connected=0;
+    timer.lap("loop", t_loop)
     top.after(500, update_temp) 
 
 def FindPort():
-   global ser, connected
+   global ser, connected, scan
    try:
        ser.close()
    except:
@@ -120,38 +141,27 @@ def FindPort():
        
    connected=0
    DMM_Name.set ("--------")
-   portlist=list(serial.tools.list_ports.comports())
-   for item in reversed(portlist):
-      portstatus.set("Trying port " + item[0])
-      top.update()
-      try:
-         ser = serial.Serial(item[0], 9600, timeout=0.5)
-         time.sleep(0.2) 
-         ser.write(b'\x03') 
-         instr = ser.readline() 
-         pstring = instr.decode();
-         if len(pstring) > 1:
-            if pstring[1]=='>':
-               ser.timeout=3  
-               portstatus.set("Connected to " + item[0])
-               ser.write(b"VDC; RATE S; *IDN?\r\n") 
-               instr=ser.readline()
-               devicename=instr.decode()
-               DMM_Name.set(devicename.replace("\r", "").replace("\n", ""))
-               ser.readline() 
-               ser.write(b"MEAS1?\r\n") 
-               connected=1
-               top.after(1000, update_temp)
-               break
-            else:
-               ser.close()
-         else:
-            ser.close()
-      except:
-         connected=0
-   if connected==0:
+   portstatus.set("Looking for the multimeter")
+   scan = portscan.MeterScan(exclude=[ser2.port] if ser2 is not None else [])
+   scan.start()
+   top.after(20, PortFound)
+
+def PortFound():
+   global ser, connected
+   if scan.is_alive():
+      top.after(20, PortFound)
+      return
+   if scan.ser is None:
       portstatus.set("Multimeter not found")
-      top.after(5000, FindPort) 
+      top.after(1000, FindPort) 
+      return
+   ser = scan.ser
+   ser.timeout=3  
+   portstatus.set("Connected to " + ser.port)
+   DMM_Name.set(scan.idn)
+   ser.write(b"MEAS1?\r\n") 
+   connected=1
+   top.after(100, update_temp)
 
 Label(top, text="Cold Junction Temperature:").grid(row=1, column=0)
 Entry(top, bd =1, width=7, textvariable=CJTemp).grid(row=2, column=0)
@@ -162,6 +172,7 @@ Label(top, textvariable=Temp, width=5, font=("Helvetica", 100), fg="blue").grid(
 Label(top, text="xxxx", textvariable=portstatus, width=40, font=("Helvetica", 12)).grid(row=7, column=0)
 Label(top, text="xxxx", textvariable=DMM_Name, width=40, font=("Helvetica", 12)).grid(row=8, column=0)
 Button(top, width=11, text = "Exit", command = Just_Exit).grid(row=9, column=0)
+top.bind("<F12>", lambda event: timer.dump())
 
 CJTemp.set ("22")
 DMMout.set ("NO DATA")
@@ -171,6 +182,7 @@ port = 'COM9' # Change to the serial port assigned to your board
 
 try:
    ser2 = serial.Serial(port, 115200, timeout=0)
+   de10_writer = WriteBack(ser2)
 except:
    print('Serial port %s is not available' % (port))
    portlist=list(serial.tools.list_ports.comports())
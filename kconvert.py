@@ -8,8 +8,23 @@ To use in your Python program:
 import kconvert
 print "For 8.15 mV with cold junction at 22 C, temperature is: ", round(kconvert.mV_to_C(8.15, 22.0),2), "C"
 
+To convert a whole logged run at once (needs NumPy):
+
+temps = kconvert.mV_to_C_array(mV_samples, 22.0)
+
+For the acquisition loops there is also a table-driven (interpolated) version,
+mV_to_C_table(), that stays within TABLE_MAX_ERROR_C of mV_to_C().  The cold
+junction voltage is cached per cold junction temperature (ColdJunction_mV()),
+and mV_to_C_compensated() converts a voltage that already includes it.
+
 """
 import math
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # only the *_array() functions need NumPy
 
 # Evaluate a polynomial in reverse order using Horner's Rule,
 # for example: a3*x^3+a2*x^2+a1*x+a0 = ((a3*x+a2)x+a1)x+a0
@@ -34,7 +49,11 @@ mV_to_C_3 = (-1.3180580E+02, +4.8302220E+01, -1.6460310E+00, +5.4647310E-02,
 ranges_mV_to_C = (-5.891, 0.0, 20.644, 54.886)
 
 def mV_to_C(mVolts, ColdJunctionTemp):
-    total_mV=mVolts+C_to_mV(ColdJunctionTemp)
+    return mV_to_C_compensated(mVolts+ColdJunction_mV(ColdJunctionTemp))
+
+# Same as mV_to_C() but for a voltage that already includes the cold junction
+# voltage, for example mVolts + ColdJunction_mV(cj) computed once outside a loop.
+def mV_to_C_compensated(total_mV):
     if total_mV < ranges_mV_to_C[0]:
         return -200.1 # indicates underrange
     elif total_mV > ranges_mV_to_C[3]:
@@ -65,6 +84,110 @@ def C_to_mV(tempC):
     else:
         return PolyEval(C_to_mV_2, tempC) + a[0] * math.exp(a[1] * (tempC - a[2]) * (tempC - a[2]))
 
+# The cold junction temperature hardly ever changes (a constant in the scripts, or
+# whatever was typed in the GUI), so remember the voltage for the last few values
+# instead of running C_to_mV() on every sample.
+@lru_cache(maxsize=8)
+def ColdJunction_mV(ColdJunctionTemp):
+    return C_to_mV(ColdJunctionTemp)
+
+# Table-driven versions of mV_to_C() and C_to_mV().  The NIST polynomials are
+# sampled once on a uniform grid per range (the first time a table function is
+# called) and then linearly interpolated, so a conversion is two table lookups
+# instead of a Horner loop plus math.exp().  With the steps below the worst
+# error against the polynomials is about 0.0006 C for mV_to_C_table() and the
+# equivalent of 0.0004 C for C_to_mV_table() (above -200 C); TABLE_MAX_ERROR_C
+# bounds the sum and is checked by the self-test at the bottom of this file.
+TABLE_STEP_mV = 0.01
+TABLE_STEP_C = 0.5
+TABLE_MAX_ERROR_C = 0.001
+
+def MakeTable(func, lo, hi, step):
+    n = int(math.ceil((hi - lo) / step))
+    h = (hi - lo) / n
+    return (lo, 1.0 / h, [func(lo + i * h) for i in range(n + 1)])
+
+Tables = None
+
+def GetTables():
+    global Tables
+    if Tables is None:
+        r = ranges_mV_to_C
+        mV_tables = (MakeTable(lambda x: PolyEval(mV_to_C_1, x), r[0], r[1], TABLE_STEP_mV),
+                     MakeTable(lambda x: PolyEval(mV_to_C_2, x), r[1], r[2], TABLE_STEP_mV),
+                     MakeTable(lambda x: PolyEval(mV_to_C_3, x), r[2], r[3], TABLE_STEP_mV))
+        r = ranges_C_to_mV
+        C_tables = (MakeTable(lambda x: PolyEval(C_to_mV_1, x), r[0], r[1], TABLE_STEP_C),
+                    MakeTable(C_to_mV, r[1], r[2], TABLE_STEP_C))
+        Tables = (mV_tables, C_tables)
+    return Tables
+
+def C_to_mV_table(tempC):
+    if tempC < ranges_C_to_mV[0] or tempC > ranges_C_to_mV[2]:
+        raise Exception("Temperature out of range in C_to_mV_table()")
+    C_tables = Tables[1] if Tables else GetTables()[1]
+    lo, inv_h, ys = C_tables[0] if tempC < ranges_C_to_mV[1] else C_tables[1]
+    pos = (tempC - lo) * inv_h
+    i = int(pos)
+    if i == len(ys) - 1: # x exactly on the upper end of the range
+        i = i - 1
+    return ys[i] + (pos - i) * (ys[i + 1] - ys[i])
+
+def mV_to_C_table(mVolts, ColdJunctionTemp):
+    # C_to_mV_table() builds the tables on first use, so Tables is set below
+    total_mV=mVolts+C_to_mV_table(ColdJunctionTemp)
+    if total_mV < ranges_mV_to_C[0]:
+        return -200.1 # indicates underrange
+    elif total_mV > ranges_mV_to_C[3]:
+        return 1372.1 # indicates overrrange
+    elif total_mV < ranges_mV_to_C[1]:
+        lo, inv_h, ys = Tables[0][0]
+    elif total_mV < ranges_mV_to_C[2]:
+        lo, inv_h, ys = Tables[0][1]
+    else:
+        lo, inv_h, ys = Tables[0][2]
+    pos = (total_mV - lo) * inv_h
+    i = int(pos)
+    if i == len(ys) - 1: # x exactly on the upper end of the range
+        i = i - 1
+    return ys[i] + (pos - i) * (ys[i + 1] - ys[i])
+
+# Array versions of the functions above.  Every element goes through the same
+# polynomial and the same operations in the same order as the scalar path, the
+# range checks are just done with masks instead of if/elif.  Inputs can be
+# scalars or anything np.asarray() accepts; a scalar in gives a scalar out.
+def PolyEvalArray(lst, x):
+    total = np.zeros_like(x)
+    for a in reversed(lst):
+        total = total*x+a
+    return total
+
+def C_to_mV_array(tempC):
+    tempC = np.asarray(tempC, dtype=float)
+    if np.any((tempC < ranges_C_to_mV[0]) | (tempC > ranges_C_to_mV[2])):
+        raise Exception("Temperature out of range in C_to_mV_array()")
+    result = np.empty_like(tempC)
+    low = tempC < ranges_C_to_mV[1]
+    result[low] = PolyEvalArray(C_to_mV_1, tempC[low])
+    t = tempC[~low]
+    result[~low] = PolyEvalArray(C_to_mV_2, t) + a[0] * np.exp(a[1] * (t - a[2]) * (t - a[2]))
+    return result[()]
+
+def mV_to_C_array(mVolts, ColdJunctionTemp):
+    total_mV = np.asarray(np.add(mVolts, C_to_mV_array(ColdJunctionTemp)), dtype=float)
+    result = np.empty_like(total_mV)
+    under = total_mV < ranges_mV_to_C[0]
+    over = total_mV > ranges_mV_to_C[3]
+    result[under] = -200.1 # indicates underrange
+    result[over] = 1372.1 # indicates overrrange
+    left = ~(under | over)
+    for coefs, upper in ((mV_to_C_1, ranges_mV_to_C[1]), (mV_to_C_2, ranges_mV_to_C[2])):
+        sel = left & (total_mV < upper)
+        result[sel] = PolyEvalArray(coefs, total_mV[sel])
+        left &= ~sel
+    result[left] = PolyEvalArray(mV_to_C_3, total_mV[left])
+    return result[()]
+
 # This section tests the correctness of the functions above by converting the range of
 # temperatures from -199C to 1372C to millivolts, converting the millivolts back to
 # temperature and then comparing the result with the original temperature.
@@ -82,3 +205,39 @@ if __name__ == '__main__':
             print ("Failed at emperature: ", TestTemp, "Got instead: ",  round(ComputedTemperature,2))
             Num_Fails=Num_Fails+1
     print ("Test finished with ", Num_Fails, "failures(s). Worst error was: ", round(Worst_Error, 2))
+
+    # Same round trip through the tables, plus a dense sweep comparing them to the
+    # polynomials directly to confirm the documented TABLE_MAX_ERROR_C.
+    Num_Fails = 0
+    Worst_Error = 0.0
+    for TestTemp in range(-199, 1372):
+        ComputedTemperature=mV_to_C_table(C_to_mV(TestTemp), 0)
+        Current_Error=math.fabs(TestTemp-ComputedTemperature)
+        Worst_Error = max(Worst_Error, Current_Error)
+        if Current_Error > 0.05:
+            print ("Table failed at temperature: ", TestTemp, "Got instead: ",  round(ComputedTemperature,2))
+            Num_Fails=Num_Fails+1
+    Table_Error = 0.0
+    for i in range(60000):
+        TestVoltage = -5.8 + i * 0.001
+        for cj in (0, 22.0):
+            Table_Error = max(Table_Error, math.fabs(mV_to_C_table(TestVoltage, cj) - mV_to_C(TestVoltage, cj)))
+    print ("Table test finished with ", Num_Fails, "failures(s). Worst error was: ", round(Worst_Error, 2),
+           "Worst difference from the polynomials was: ", round(Table_Error, 5),
+           "(OK)" if Table_Error <= TABLE_MAX_ERROR_C else "(FAILED)")
+
+    # The array functions must agree with the scalar ones to within 1e-9, including
+    # the under/over-range sentinels and an array of cold junction temperatures.
+    if np is not None:
+        TestTemps = np.arange(-199, 1372, dtype=float)
+        TestVoltages = C_to_mV_array(TestTemps)
+        TestVoltages = np.concatenate((TestVoltages, [-7.0, 60.0]))
+        ColdJunctions = np.linspace(-10.0, 60.0, TestVoltages.size)
+        Array_Error = 0.0
+        for cj in (0, 22.0, ColdJunctions):
+            Computed = mV_to_C_array(TestVoltages, cj)
+            Expected = [mV_to_C(mv, c) for mv, c in zip(TestVoltages, np.broadcast_to(cj, TestVoltages.shape))]
+            Array_Error = max(Array_Error, float(np.max(np.abs(Computed - Expected))))
+        Array_Error = max(Array_Error, float(np.max(np.abs(TestVoltages[:-2] - [C_to_mV(t) for t in TestTemps]))))
+        print ("Array test finished. Worst difference from the scalar path was: ", Array_Error,
+               "(OK)" if Array_Error <= 1e-9 else "(FAILED)")
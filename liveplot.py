@@ -0,0 +1,93 @@
+"""
+liveplot.py: Helpers for the live reflow plot.
+
+minmax_decimate() cuts a long trace down to a min/max envelope with one pair of
+points per pixel column, so the number of segments sent to the LineCollection
+is bounded by the axes width however long the run is, and the peaks and
+overshoot of the reflow profile stay visible.
+
+BlitRenderer redraws only the artists that change every frame (the temperature
+LineCollection, the DMM line and the info text) on top of a cached copy of the
+static background (axes, grid, ticks, labels, legend).  A full
+fig.canvas.draw() only happens when the x limits change, when the window is
+resized (matplotlib redraws by itself then) or when the backend cannot blit.
+
+To use in your Python program:
+
+from liveplot import BlitRenderer
+
+renderer = BlitRenderer(fig, ax, [lc, line_dmm, info_text])
+while True:
+    x, y = minmax_decimate(x_window, y_window, int(ax.bbox.width))
+    lc.set_segments(line_segments(x, y))
+    ...update the other artists, ax.set_xlim(...)...
+    renderer.update()
+
+"""
+import math
+
+import numpy as np
+
+def minmax_decimate(x, y, buckets):
+    """
+    Splits the samples into (about) buckets groups of equal size and keeps the
+    minimum and the maximum of y in each group, in time order.  The newest
+    samples that do not fill a whole group are kept as they are.  Returns x, y
+    unchanged when there are no more than 2 * buckets samples.
+    """
+    n = len(y)
+    if buckets <= 0 or n <= 2 * buckets:
+        return x, y
+    k = int(math.ceil(n / buckets))
+    m = (n // k) * k
+    groups = np.asarray(y[:m]).reshape(-1, k)
+    base = np.arange(0, m, k)
+    i_min = base + np.argmin(groups, axis=1)
+    i_max = base + np.argmax(groups, axis=1)
+    idx = np.column_stack((np.minimum(i_min, i_max), np.maximum(i_min, i_max))).ravel()
+    idx = np.concatenate((idx, np.arange(m, n)))
+    return x[idx], y[idx]
+
+def line_segments(x, y):
+    """The len(x) - 1 segments joining consecutive points, for LineCollection.set_segments()."""
+    segs = np.empty((max(len(x) - 1, 0), 2, 2))
+    segs[:, 0, 0] = x[:-1]
+    segs[:, 0, 1] = y[:-1]
+    segs[:, 1, 0] = x[1:]
+    segs[:, 1, 1] = y[1:]
+    return segs
+
+class BlitRenderer:
+    def __init__(self, fig, ax, artists):
+        self.fig = fig
+        self.ax = ax
+        self.canvas = fig.canvas
+        self.artists = list(artists)
+        self.background = None
+        self.xlim = None
+        self.blit = getattr(self.canvas, "supports_blit", False)
+        if self.blit:
+            # Animated artists are left out of a normal draw; on_draw() puts
+            # them back on top after saving the background without them.
+            for artist in self.artists:
+                artist.set_animated(True)
+            self.canvas.mpl_connect("draw_event", self.on_draw)
+
+    def on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self.draw_artists()
+
+    def draw_artists(self):
+        for artist in self.artists:
+            self.fig.draw_artist(artist)
+
+    def update(self):
+        xlim = self.ax.get_xlim()
+        if not self.blit or self.background is None or xlim != self.xlim:
+            self.xlim = xlim
+            self.canvas.draw()  # full redraw; on_draw() caches the new background
+        else:
+            self.canvas.restore_region(self.background)
+            self.draw_artists()
+            self.canvas.blit(self.fig.bbox)
+        self.canvas.flush_events()
@@ -0,0 +1,159 @@
+"""
+meter_driver.py: Pipelined query driver for the Fluke 45 / Tek DMM40xx.
+
+read_meter_vdc() writes MEAS1?, waits for the value, reads the "=>" prompt and
+only then writes the next MEAS1?, so every sample pays for a full round trip
+at 9600 baud on top of the measurement itself.  PipelinedMeter keeps depth
+queries queued in the meter (it executes them one after the other), so the
+next measurement starts as soon as the last one is done, and reads the replies
+as a stream of lines instead of expecting value, prompt, value, prompt:
+
+  - a line that parses as a number is a reading,
+  - "=>" ends one query and a new query is written to keep depth queued,
+  - "?>" / "!>" (command / execution error) also end a query, but are counted,
+  - anything else is ignored.
+
+So a reply that comes out of step (the old s[1] == ">" case) costs nothing.
+If no line arrives for resync_after seconds while queries are queued, or
+after MAX_ERRORS errors in a row, the driver sends Ctrl+C (the meter drops
+its queue and answers "=>") and starts queueing again.
+
+The measurement rate is set with the RATE command at open time: "S" (slow,
+about 2.5 readings/s, most digits), "M" (medium, about 5/s) or "F" (fast,
+about 20/s, fewer digits).  Pipelining matters most at "M" and "F", where the
+round trip is a large part of each sample.
+
+To use in your Python program:
+
+import serial
+from meter_driver import PipelinedMeter
+
+ser = serial.Serial("COM12", 9600, timeout=0.5)
+meter = PipelinedMeter(ser, rate="M")
+meter.open()
+while True:
+    volts = meter.read()  # newest reading, or None if none came in within the port timeout
+
+"""
+import time
+
+PROMPTS = (b"=>", b"?>", b"!>")
+MAX_ERRORS = 3
+
+def is_number(line):
+    try:
+        float(line.replace(b"VDC", b""))
+        return True
+    except ValueError:
+        return False
+
+class PipelinedMeter:
+    def __init__(self, ser, query=b"MEAS1?", rate="S", depth=2, resync_after=3.0):
+        self.ser = ser
+        self.query = query + b"\r\n"
+        self.rate = rate
+        self.depth = depth
+        self.resync_after = resync_after
+        self.buf = bytearray()
+        self.pending = 0        # queries written and not answered yet
+        self.errors = 0         # "?>" / "!>" prompts in a row
+        self.last_line = time.monotonic()
+        self.idn = ""
+        self.text = None        # newest reading as the meter sent it, e.g. "+1.2345E-3 VDC"
+        self.readings = 0
+        self.resyncs = 0
+
+    def open(self):
+        """Puts the meter in VDC at the chosen rate, reads *IDN? and starts the queries."""
+        ser = self.ser
+        ser.write(b"\x03")
+        ser.readline()
+        old_timeout, ser.timeout = ser.timeout, 3
+        ser.write(b"VDC; RATE %s; *IDN?\r\n" % self.rate.encode())
+        # Skip replies to queries still queued from before (prompts, readings)
+        for _ in range(2 * self.depth + 4):
+            line = ser.readline().strip(b"\r\n\x03 ")
+            if line and line not in PROMPTS and not is_number(line):
+                self.idn = line.decode(errors="ignore")
+                break
+        ser.readline()  # discard prompt
+        ser.timeout = old_timeout
+        self.fill()
+        return self.idn
+
+    def fill(self):
+        if self.pending < self.depth:
+            self.ser.write(self.query * (self.depth - self.pending))
+            self.pending = self.depth
+        self.last_line = time.monotonic()
+
+    def resync(self):
+        """Ctrl+C: the meter drops what it was doing and answers with a prompt."""
+        self.resyncs += 1
+        self.ser.reset_input_buffer()
+        self.buf.clear()
+        self.ser.write(b"\x03")
+        self.pending = 1  # the prompt for the Ctrl+C
+        self.errors = 0
+        self.last_line = time.monotonic()
+
+    def read(self):
+        """
+        Reads whatever the meter sent (waiting up to the port timeout) and
+        returns the newest reading in volts, or None if there was none.
+        """
+        ser = self.ser
+        data = ser.read(ser.in_waiting or 1)
+        if ser.in_waiting:
+            data += ser.read(ser.in_waiting)
+        self.buf += data
+
+        value = None
+        end = self.buf.rfind(b"\n") + 1
+        if end:
+            for line in bytes(self.buf[:end]).split(b"\n"):
+                line = line.strip(b"\r\x03 ")
+                if not line:
+                    continue
+                self.last_line = time.monotonic()
+                if line in PROMPTS:
+                    self.pending = max(0, self.pending - 1)
+                    self.errors = 0 if line == b"=>" else self.errors + 1
+                    continue
+                if is_number(line):
+                    value = float(line.replace(b"VDC", b""))
+                    self.text = line.decode(errors="ignore")
+                    self.readings += 1
+            del self.buf[:end]
+
+        if self.errors >= MAX_ERRORS or (self.pending and time.monotonic() - self.last_line > self.resync_after):
+            self.resync()
+        elif self.pending < self.depth:
+            self.fill()
+        return value
+
+if __name__ == '__main__':
+    # Self-test against the simulated meter: pipelined vs one query at a time
+    import serial
+    import sim_devices
+
+    dmm = sim_devices.SimDMM(follow_rate=True, baud=9600)
+    dmm.start()
+    for depth in (1, 2):
+        ser = serial.Serial(dmm.port, 9600, timeout=0.5)
+        meter = PipelinedMeter(ser, rate="F", depth=depth)
+        print("IDN:", meter.open())
+        t0 = time.monotonic()
+        values = []
+        while time.monotonic() - t0 < 2.0:
+            v = meter.read()
+            if v is not None:
+                values.append(v)
+        print(f"depth {depth}: {len(values) / 2.0:.1f} readings/s, last {values[-1]:.5f} V")
+        ser.write(b"garbage\r\n")  # out of step: an error prompt, then back to normal
+        n = meter.readings
+        t0 = time.monotonic()
+        while time.monotonic() - t0 < 0.5:
+            meter.read()
+        print(f"after a bad command: {meter.readings - n} more readings, resyncs {meter.resyncs}")
+        ser.close()
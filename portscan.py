@@ -0,0 +1,241 @@
+"""
+portscan.py: Finds the multimeter and the DE10 among the serial ports.
+
+FindPort() tried one port after the other, each with a 0.2 s sleep, a 0.5 s
+read timeout and then the 3 s *IDN? timeout, on the Tk thread, so with a few
+ports (Bluetooth, the DE10, ...) finding the meter took seconds and the window
+froze meanwhile.  Here every candidate port is probed at the same time, each
+in its own thread and with its own deadline, and the first port that answers
+like the device wins; the others are closed as their probes finish.
+
+The device found last time is remembered in CACHE_FILE by USB VID/PID and
+serial number (a USB adapter often comes back under another COM number after
+a glitch), and that port is probed on its own first, with a short deadline, so
+a reconnect normally takes one round trip.  Only if it does not answer are all
+the other ports probed.  Ports without USB ids are remembered by name.
+
+  meter: Ctrl+C must be answered with a "=>" style prompt; the port is left
+         open in VDC at the chosen RATE, with the *IDN? line read
+  DE10:  an ADC0 frame (ASCII "A0=HHLL" or binary) must arrive in time; only
+         the port name is returned
+
+To use in your Python program:
+
+import portscan
+
+ser, idn = portscan.find_meter(exclude=[DE10_PORT])   # (None, "") if not found
+de10_port = portscan.find_de10(exclude=[ser.port])     # None if not found
+
+scan = portscan.MeterScan(exclude=[DE10_PORT])         # same, in the background (Tk)
+scan.start()
+...
+if not scan.is_alive():
+    ser, idn = scan.ser, scan.idn
+
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import serial
+import serial.tools.list_ports
+
+from de10_stream import DE10FrameParser
+
+CACHE_FILE = os.path.join(os.path.expanduser("~"), ".reflow_ports.json")
+PROBE_TIMEOUT = 1.5    # seconds each port gets in a full scan
+CACHED_TIMEOUT = 0.5   # seconds the remembered port gets before the full scan
+PROMPT_TIMEOUT = 0.25  # seconds to wait for the prompt before sending Ctrl+C again
+IDN_TIMEOUT = 3.0      # seconds for the *IDN? reply, once the port is known to be a meter
+
+# ============================================================
+# PORT CACHE
+# ============================================================
+
+def port_key(info):
+    """What identifies the device on a port: USB VID/PID + serial number, or the port name."""
+    if info.vid is not None:
+        return {"vid": info.vid, "pid": info.pid, "serial_number": info.serial_number}
+    return {"device": info.device}
+
+def load_cache(cache_file=CACHE_FILE):
+    try:
+        with open(cache_file) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_cache(role, info, cache_file=CACHE_FILE):
+    cache = load_cache(cache_file)
+    if cache.get(role) == port_key(info):
+        return
+    cache[role] = port_key(info)
+    try:
+        with open(cache_file, "w") as f:
+            json.dump(cache, f, indent=2)
+    except OSError:
+        pass  # read-only home: every start does a full scan
+
+def cached_port(role, ports, cache_file=CACHE_FILE):
+    """The port in ports that had the device last time, or None."""
+    key = load_cache(cache_file).get(role)
+    for info in ports:
+        if key == port_key(info):
+            return info
+    return None
+
+# ============================================================
+# PROBES
+# ============================================================
+# Each takes a port name and a deadline (time.monotonic()) and returns what
+# was found, or None; a probe that fails closes its port.
+
+def probe_meter(device, deadline, baud=9600, rate="S"):
+    """Returns (open serial.Serial, idn) if a Fluke 45 / Tek DMM40xx answers on device."""
+    try:
+        ser = serial.Serial(device, baud, timeout=PROMPT_TIMEOUT)
+    except (serial.SerialException, OSError, ValueError):
+        return None
+    try:
+        # Ctrl+C until a prompt comes back (a meter that was just plugged in may miss the first)
+        while time.monotonic() < deadline:
+            ser.timeout = max(0.01, min(PROMPT_TIMEOUT, deadline - time.monotonic()))
+            ser.write(b"\x03")
+            line = ser.readline()
+            if len(line) > 1 and line[1:2] == b">":
+                break
+        else:
+            ser.close()
+            return None
+        ser.timeout = IDN_TIMEOUT
+        ser.reset_input_buffer()
+        ser.write(b"VDC; RATE %s; *IDN?\r\n" % rate.encode())
+        idn = ser.readline().decode(errors="ignore").strip()
+        ser.readline()  # discard the prompt
+        return ser, idn
+    except (serial.SerialException, OSError):
+        ser.close()
+        return None
+
+def probe_de10(device, deadline, baud=115200):
+    """Returns device if an ADC0 frame arrives on it before the deadline."""
+    try:
+        ser = serial.Serial(device, baud, timeout=0.05)
+    except (serial.SerialException, OSError, ValueError):
+        return None
+    parser = DE10FrameParser()
+    try:
+        while time.monotonic() < deadline:
+            parser.feed(ser.read(ser.in_waiting or 1))
+            if parser.frames:
+                return device
+        return None
+    except (serial.SerialException, OSError):
+        return None
+    finally:
+        ser.close()
+
+def close_result(result):
+    if isinstance(result, tuple):
+        result[0].close()
+
+# ============================================================
+# SCAN
+# ============================================================
+
+def scan(role, probe, exclude=(), timeout=PROBE_TIMEOUT, ports=None, cache_file=CACHE_FILE):
+    """
+    Probes the remembered port for role first, then all the others at once.
+    Returns the first probe result, or None.  ports defaults to comports().
+    """
+    if ports is None:
+        ports = serial.tools.list_ports.comports()
+    exclude = {name.upper() for name in exclude if name}
+    ports = [info for info in ports if info.device.upper() not in exclude]
+
+    cached = cached_port(role, ports, cache_file)
+    if cached is not None:
+        result = probe(cached.device, time.monotonic() + min(timeout, CACHED_TIMEOUT))
+        if result is not None:
+            return result
+        ports = [info for info in ports if info is not cached]
+    if not ports:
+        return None
+
+    deadline = time.monotonic() + timeout
+    found = threading.Event()
+    winner = []
+    lock = threading.Lock()
+
+    def run(info):
+        result = probe(info.device, deadline)
+        with lock:
+            if result is not None and not winner:
+                winner.append(result)
+                save_cache(role, info, cache_file)
+                found.set()
+            else:
+                close_result(result)  # no device, or a second one after the first
+        return result
+
+    pool = ThreadPoolExecutor(max_workers=len(ports))
+    futures = [pool.submit(run, info) for info in ports]
+    # Done at the first success, or when every probe has failed
+    while not found.wait(0.01):
+        if all(future.done() for future in futures):
+            break
+    pool.shutdown(wait=False)  # the rest finish (and close their ports) by the deadline
+    return winner[0] if winner else None
+
+def find_meter(exclude=(), rate="S", timeout=PROBE_TIMEOUT, ports=None, cache_file=CACHE_FILE):
+    """Returns (open serial.Serial, idn) of the multimeter, or (None, "")."""
+    result = scan("meter", lambda device, deadline: probe_meter(device, deadline, rate=rate),
+                  exclude, timeout, ports, cache_file)
+    return result if result is not None else (None, "")
+
+def find_de10(exclude=(), timeout=PROBE_TIMEOUT, ports=None, cache_file=CACHE_FILE):
+    """Returns the port name of the DE10, or None."""
+    return scan("de10", probe_de10, exclude, timeout, ports, cache_file)
+
+class MeterScan(threading.Thread):
+    """find_meter() in a background thread, so a GUI stays responsive. Poll is_alive()."""
+    def __init__(self, **kwargs):
+        threading.Thread.__init__(self, name="meter-scan", daemon=True)
+        self.kwargs = kwargs
+        self.ser = None
+        self.idn = ""
+
+    def run(self):
+        self.ser, self.idn = find_meter(**self.kwargs)
+
+if __name__ == '__main__':
+    # Self-test against the simulated devices, with a few ports that are not them
+    import tempfile
+    import sim_devices
+    from serial.tools.list_ports_common import ListPortInfo
+
+    dmm = sim_devices.SimDMM(meas_delay=0.05, baud=9600)
+    de10 = sim_devices.SimDE10(rate=20.0)
+    silent = [sim_devices.open_pty() for _ in range(3)]  # ports nothing answers on
+    dmm.start()
+    de10.start()
+    ports = [ListPortInfo(path) for path in [p for _, _, p in silent] + [de10.port, dmm.port]]
+    cache_file = os.path.join(tempfile.mkdtemp(), "ports.json")
+
+    for attempt in ("first start (no cache)", "second start (cached)"):
+        t0 = time.monotonic()
+        ser, idn = find_meter(exclude=[de10.port], ports=ports, cache_file=cache_file)
+        t1 = time.monotonic()
+        de10_port = find_de10(exclude=[ser.port], ports=ports, cache_file=cache_file)
+        t2 = time.monotonic()
+        print(f"{attempt}: meter {ser.port} {idn!r} in {t1 - t0:.3f} s, DE10 {de10_port} in {t2 - t1:.3f} s")
+        assert ser.port == dmm.port and idn and de10_port == de10.port
+        ser.close()
+    print("cache:", load_cache(cache_file))
+
+    ser, idn = find_meter(exclude=[de10.port, dmm.port], ports=ports, cache_file=cache_file)
+    print(f"no meter: {ser}, in {time.monotonic() - t2:.3f} s")
+    assert ser is None
+    print("OK")
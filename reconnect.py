@@ -0,0 +1,169 @@
+"""
+reconnect.py: Background reconnect manager for a serial device.
+
+When the multimeter drops out (USB glitch, cable pulled, meter switched off)
+reopening it inline costs sleeps and seconds of timeouts, and an open that
+fails outright ends the script, while the DE10 is still running its FSM off
+the temperatures it is sent.  Link keeps the device open from its own thread
+instead:
+
+  - open_func() is retried with exponential backoff (BASE_DELAY doubling up
+    to MAX_DELAY) and jitter (each wait is a random time between half and
+    all of the backoff), so a device that is gone for good costs a few
+    tries a minute, not a busy loop, and a glitch is retried at once;
+  - the reader calls get() for the open device, or None while it is down
+    (wait_up() sleeps until it is back), and lost() when it fails;
+  - state changes are reported as they happen, and status() / report() give
+    the current state, the time down, and the number of outages and
+    attempts.
+
+Nothing else waits for the device, so the DE10 path keeps its full rate.
+
+To use in your Python program:
+
+from reconnect import Link
+
+meter_link = Link("meter", lambda: open_meter(METER_PORT), close_func=lambda ser: ser.close())
+meter_link.start()
+meter_link.wait_up(5.0)              # optional: give the first open a head start
+while True:
+    ser = meter_link.get()
+    if ser is None:
+        meter_link.wait_up(0.5)      # down: the link is reconnecting
+        continue
+    try:
+        v = read_meter_vdc(ser)
+    except Exception as e:
+        meter_link.lost(e)           # close it and reconnect in the background
+
+"""
+import random
+import threading
+import time
+
+BASE_DELAY = 0.25  # seconds before the first retry
+MAX_DELAY = 4.0    # seconds, cap on the backoff
+
+CONNECTING, UP, DOWN = "connecting", "up", "down"
+
+class Link(threading.Thread):
+    def __init__(self, name, open_func, close_func=None, base_delay=BASE_DELAY, max_delay=MAX_DELAY,
+                 log=print):
+        threading.Thread.__init__(self, name=name + "-link", daemon=True)
+        self.device_name = name
+        self.open_func = open_func
+        self.close_func = close_func
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.log = log
+        self.device = None
+        self.state = CONNECTING
+        self.error = None          # why the last open or the device failed
+        self.attempts = 0          # failed opens since the device went down
+        self.outages = 0           # times an open device was lost
+        self.down_since = time.monotonic()
+        self.downtime = 0.0        # seconds, finished outages only
+        self.running = True
+        self.lock = threading.Lock()
+        self.wake = threading.Event()  # lost() or stop(): the thread has something to do
+        self.up = threading.Event()
+
+    def get(self):
+        """The open device, or None while it is down."""
+        return self.device
+
+    def wait_up(self, timeout=None):
+        """Waits until the device is up. Returns True if it is."""
+        return self.up.wait(timeout)
+
+    def lost(self, error=None):
+        """Called by the reader when the device failed: closes it and reconnects in the background."""
+        with self.lock:
+            if self.state != UP:
+                return
+            device, self.device = self.device, None
+            self.up.clear()
+            self.state = DOWN
+            self.error = error
+            self.outages += 1
+            self.attempts = 0
+            self.down_since = time.monotonic()
+        self.log(f"[LINK] {self.device_name} lost ({error or 'no reply'}), reconnecting in the background")
+        if self.close_func is not None:
+            try:
+                self.close_func(device)
+            except Exception:
+                pass
+        self.wake.set()
+
+    def backoff(self):
+        """Seconds to wait before the next open: exponential in the failed attempts, with jitter."""
+        delay = min(self.max_delay, self.base_delay * 2 ** max(0, self.attempts - 1))
+        return random.uniform(delay / 2, delay)
+
+    def run(self):
+        while self.running:
+            if self.state == UP:
+                self.wake.wait()
+                self.wake.clear()
+                continue
+            try:
+                device = self.open_func()
+            except Exception as e:
+                device = None
+                self.error = e
+            if device is None:
+                self.attempts += 1
+                if self.attempts == 1:
+                    self.log(f"[LINK] {self.device_name} open failed ({self.error}), retrying with backoff")
+                self.wake.wait(self.backoff())
+                self.wake.clear()
+                continue
+            down = time.monotonic() - self.down_since
+            self.log(f"[LINK] {self.device_name} up after {down:.1f} s and {self.attempts + 1} attempt(s)")
+            with self.lock:
+                if self.state == DOWN:
+                    self.downtime += down
+                self.device = device
+                self.state = UP
+                self.up.set()
+
+    def stop(self):
+        self.running = False
+        self.wake.set()
+
+    def status(self):
+        """One line: the state, and for how long / after how many attempts when it is not up."""
+        if self.state == UP:
+            return f"{self.device_name}: up"
+        return (f"{self.device_name}: {self.state} for {time.monotonic() - self.down_since:.1f} s, "
+                f"{self.attempts} attempt(s)")
+
+    def report(self):
+        downtime = self.downtime + (time.monotonic() - self.down_since if self.state != UP else 0.0)
+        return f"Link {self.device_name}: {self.state}, {self.outages} outage(s), {downtime:.1f} s down in total"
+
+if __name__ == '__main__':
+    # Self-test: a device that fails to open a few times, then drops out once
+    log = []
+    fail = {"opens": 3}
+
+    def open_dev():
+        if fail["opens"] > 0:
+            fail["opens"] -= 1
+            raise OSError("port not found")
+        return "device"
+
+    link = Link("dev", open_dev, base_delay=0.02, max_delay=0.1, log=log.append)
+    link.start()
+    t0 = time.monotonic()
+    assert link.wait_up(2.0) and link.get() == "device"
+    print(f"up after {time.monotonic() - t0:.3f} s (3 failed opens, backoff 0.01-0.02, 0.02-0.04, 0.04-0.08 s)")
+    fail["opens"] = 5
+    link.lost(OSError("read failed"))
+    assert link.get() is None and link.status().startswith("dev: down")
+    assert link.wait_up(2.0)
+    print(link.report())
+    print("\n".join(log))
+    assert link.outages == 1 and link.state == UP and 0.0 < link.downtime < 1.0
+    print("OK")
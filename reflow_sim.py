@@ -0,0 +1,341 @@
+"""
+reflow_sim.py: The DE10 reflow state machine on a simulated oven, faster than real time.
+
+Trying a profile or an abort rule on the oven takes a full 6+ minute run.
+ReflowFSM does what FSM_Reflow_TempBased, Seconds_Tick, StartupAbort_Check60
+and the STOP/CONFIRM handling in integration/integrated.asm do, on the values
+the firmware sees: the whole-degree temperature it parses from the PC's UART
+lines (0..255 C), its one-byte seconds counter and the 20-step PWM window.
+
+  state    heater                      leaves when
+  IDLE     0%                          CONFIRM (GO)
+  PREHEAT  RAMP_DUTY (100%)            T > temp_soak             -> SOAK
+  SOAK     HOLD_DUTY                   seconds >= time_soak      -> RAMP
+  RAMP     RAMP_DUTY (100%)            T > temp_reflow           -> REFLOW
+  REFLOW   HOLD_DUTY                   seconds >= time_reflow    -> COOL
+  COOL     0%                          T < COOL_DONE_C (60 C)    -> IDLE
+  ABORT    0%                          CONFIRM                   -> IDLE
+
+Abort rules: STOP (or CYCLE) while running goes straight back to IDLE; 60 s
+after GO the run goes to ABORT if T has not risen by 50 C since GO.
+
+The firmware's header comment gives 60% for the holds, but the code writes
+pwm_duty = 20 in SOAK and REFLOW, so HOLD_DUTY is 20; pass hold_duty=60 for
+the documented behaviour.
+
+Oven is a first-order model with dead time:
+
+  tau * dT/dt = gain * heater(t - dead_time) - (T - ambient)
+
+gain is how far above ambient the oven would settle at 100%, tau how fast it
+gets there, and dead_time how long the element and the air take to pass a
+change of the heater on to the thermocouple (the cause of the overshoot).
+Each step is solved exactly for a heater held constant over the step, so the
+default 0.1 s step (one 20-tick PWM window) loses nothing to the PWM, and a
+whole run takes a few milliseconds.
+
+python reflow_sim.py                                   # the default profile
+python reflow_sim.py --temp-soak 170 --time-soak 60 --temp-reflow 240 --time-reflow 45
+python reflow_sim.py --gain 120                        # an oven too weak: ABORT at 60 s
+python reflow_sim.py --stop-at 200 --plot              # STOP pressed 200 s after GO
+
+To use in your Python program:
+
+import reflow_sim
+
+run = reflow_sim.simulate(temp_soak=150, time_soak=90, temp_reflow=220, time_reflow=60,
+                          oven=reflow_sim.Oven(gain=300.0, tau=200.0, dead_time=8.0))
+print(run.summary())
+run.t, run.temp, run.state, run.duty   # NumPy arrays, one entry per sample sent to the DE10
+run.events                             # [(t, "SOAK"), (t, "RAMP"), ...]
+
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+
+# ============================================================
+# FIRMWARE CONSTANTS (integration/integrated.asm)
+# ============================================================
+
+IDLE, PREHEAT, SOAK, RAMP, REFLOW, COOL, ABORT = range(7)
+STATE_NAMES = ("IDLE", "PREHEAT", "SOAK", "RAMP", "REFLOW", "COOL", "ABORT")
+
+RAMP_DUTY = 100         # % in PREHEAT and RAMP
+HOLD_DUTY = 20          # % in SOAK and REFLOW
+COOL_DONE_C = 60        # COOL -> IDLE below this
+STARTUP_CHECK_S = 60    # seconds after GO ...
+STARTUP_RISE_C = 50     # ... by which T must have risen this much, or ABORT
+PWM_STEPS = 20          # PWM window in timer ticks, duty / 5 of them on
+TICK_S = 0.005          # Timer0 tick (TICKS_PER_SEC = 200)
+
+# Profile options of the UI (UIWorkingABD.asm), the first of each is its default
+TIME_SOAK_OPTIONS = (60, 90, 120)
+TEMP_SOAK_OPTIONS = (130, 150, 170)
+TIME_REFLOW_OPTIONS = (45, 60, 75)
+TEMP_REFLOW_OPTIONS = (200, 220, 240)
+
+# ============================================================
+# FSM
+# ============================================================
+
+class ReflowFSM:
+    def __init__(self, temp_soak=150, time_soak=90, temp_reflow=220, time_reflow=60, hold_duty=HOLD_DUTY):
+        self.temp_soak = temp_soak
+        self.time_soak = time_soak
+        self.temp_reflow = temp_reflow
+        self.time_reflow = time_reflow
+        self.hold_duty = hold_duty
+        self.state = IDLE
+        self.seconds = 0          # one byte, reset on every state change that the firmware resets it on
+        self.pwm_duty = 0
+        self.temp_current = 0     # whole degrees, 0..255, as parsed from the last UART line
+        self.temp_start = 0
+        self.startup_sec = 0
+        self.startup_active = False
+
+    def receive(self, temp_c):
+        """A temperature line from the PC: ParseTempLine keeps the integer part, 0..255."""
+        self.temp_current = min(255, max(0, int(temp_c))) if math.isfinite(temp_c) else 0
+
+    def heater(self):
+        """Fraction of the PWM window the heater is on at the current duty."""
+        return (self.pwm_duty // 5) / PWM_STEPS
+
+    def second(self):
+        """Seconds_Tick, once every TICKS_PER_SEC ticks."""
+        if self.startup_active:
+            self.startup_sec += 1
+            if self.startup_sec == STARTUP_CHECK_S:
+                self.startup_check()
+        if self.state != ABORT:
+            self.seconds = (self.seconds + 1) & 0xFF
+
+    def startup_check(self):
+        """StartupAbort_Check60: ABORT if T has not risen by STARTUP_RISE_C since GO."""
+        self.startup_active = False
+        if self.temp_current - self.temp_start < STARTUP_RISE_C:
+            self.pwm_duty = 0
+            self.state = ABORT
+            self.seconds = 0
+            self.startup_sec = 0
+
+    def step(self):
+        """FSM_Reflow_TempBased. Returns the state."""
+        state = self.state
+        if state == IDLE:
+            self.pwm_duty = 0
+        elif state == PREHEAT:
+            self.pwm_duty = RAMP_DUTY
+            if self.temp_current > self.temp_soak:
+                self.seconds = 0
+                self.state = SOAK
+        elif state == SOAK:
+            self.pwm_duty = self.hold_duty
+            if self.seconds >= self.time_soak:
+                self.seconds = 0
+                self.state = RAMP
+        elif state == RAMP:
+            self.pwm_duty = RAMP_DUTY
+            if self.temp_current > self.temp_reflow:
+                self.seconds = 0
+                self.state = REFLOW
+        elif state == REFLOW:
+            self.pwm_duty = self.hold_duty
+            if self.seconds >= self.time_reflow:
+                self.pwm_duty = 0
+                self.state = COOL
+        elif state == COOL:
+            self.pwm_duty = 0
+            if self.temp_current < COOL_DONE_C:
+                self.state = IDLE
+        return self.state
+
+    def confirm(self):
+        """CONFIRM: GO in IDLE, acknowledges ABORT, ignored while running."""
+        if self.state == IDLE:
+            self.seconds = 0
+            self.state = PREHEAT
+            self.temp_start = self.temp_current
+            self.startup_sec = 0
+            self.startup_active = True
+        elif self.state == ABORT:
+            self.reset()
+
+    def stop(self):
+        """STOP (or CYCLE) while running: heater off, back to IDLE."""
+        if self.state not in (IDLE, ABORT):
+            self.reset()
+
+    def reset(self):
+        self.pwm_duty = 0
+        self.state = IDLE
+        self.seconds = 0
+        self.startup_sec = 0
+        self.startup_active = False
+
+# ============================================================
+# OVEN MODEL
+# ============================================================
+
+class Oven:
+    def __init__(self, ambient=22.0, gain=300.0, tau=200.0, dead_time=8.0):
+        """
+        ambient: C; gain: C above ambient the oven settles at with the heater
+        always on; tau: seconds; dead_time: seconds from the heater to the
+        thermocouple.
+        """
+        self.ambient = ambient
+        self.gain = gain
+        self.tau = tau
+        self.dead_time = dead_time
+        self.temp = ambient
+
+    def stepper(self, dt):
+        """Returns step(heater) -> temperature after dt more seconds, with this oven's dead time."""
+        decay = math.exp(-dt / self.tau)
+        delayed = [0.0] * max(0, int(round(self.dead_time / dt)))  # heater of the last dead_time seconds
+        ambient, gain = self.ambient, self.gain
+        i = 0
+
+        def step(heater):
+            nonlocal i
+            if delayed:
+                delayed[i], heater = heater, delayed[i]
+                i = (i + 1) % len(delayed)
+            settle = ambient + gain * heater
+            self.temp = settle + (self.temp - settle) * decay
+            return self.temp
+        return step
+
+# ============================================================
+# SIMULATION
+# ============================================================
+
+class Run:
+    def __init__(self, t, temp, state, duty, events, aborted, stopped, wall):
+        self.t = t              # seconds since GO, one entry per sample sent to the DE10
+        self.temp = temp        # oven (thermocouple) temperature, C
+        self.state = state      # fsm state when the sample was taken
+        self.duty = duty        # pwm_duty, %
+        self.events = events    # [(t, state name)] at every state change, starting with PREHEAT at 0
+        self.aborted = aborted  # ended in ABORT (startup rise check)
+        self.stopped = stopped  # ended by STOP
+        self.wall = wall        # seconds the simulation took
+
+    @property
+    def duration(self):
+        return float(self.t[-1]) if len(self.t) else 0.0
+
+    def state_times(self):
+        """Seconds spent in each state, by name, in the order they were entered (not the IDLE/ABORT that ended it)."""
+        events = self.events[:-1] if self.events[-1][1] in ("IDLE", "ABORT") else self.events
+        ends = [t for t, _ in self.events[1:]] + [self.duration]
+        times = {}
+        for (t, name), end in zip(events, ends):
+            times[name] = times.get(name, 0.0) + end - t
+        return times
+
+    def summary(self):
+        if self.aborted:
+            outcome = "ABORT"
+        elif self.stopped:
+            outcome = "stopped"
+        elif self.events[-1][1] == "IDLE":
+            outcome = "done"
+        else:
+            outcome = "timed out in " + self.events[-1][1]
+        times = ", ".join(f"{name} {s:.0f} s" for name, s in self.state_times().items())
+        speed = self.duration / self.wall if self.wall > 0 else float("inf")
+        peak = float(np.max(self.temp)) if len(self.temp) else math.nan
+        return (f"{outcome} after {self.duration:.0f} s, peak {peak:.1f} C: {times} "
+                f"({self.wall * 1000:.1f} ms, {speed:.0f} x real time)")
+
+def simulate(temp_soak=150, time_soak=90, temp_reflow=220, time_reflow=60, hold_duty=HOLD_DUTY, oven=None,
+             dt=PWM_STEPS * TICK_S, sample_period=0.5, t_max=1200.0, stop_at=None):
+    """
+    Runs one reflow, from GO at the oven's current temperature (ambient for a
+    new Oven), until the FSM is back in IDLE, goes to ABORT, is
+    stopped (stop_at: seconds after GO) or t_max seconds have passed.
+
+    dt: simulation step (default one PWM window); sample_period: how often the
+    PC sends the temperature to the DE10, rounded to whole steps.
+    """
+    wall = time.perf_counter()
+    oven = oven if oven is not None else Oven()
+    fsm = ReflowFSM(temp_soak, time_soak, temp_reflow, time_reflow, hold_duty)
+    step = oven.stepper(dt)
+    every = max(1, int(round(sample_period / dt)))
+    per_second = 1.0 / dt
+
+    fsm.receive(oven.temp)
+    fsm.confirm()
+    fsm.step()
+    ts, temps, states, duties = [], [], [], []
+    events = [(0.0, STATE_NAMES[fsm.state])]
+    state = fsm.state
+    n = int(t_max / dt)
+    stop_n = int(round(stop_at / dt)) if stop_at is not None else -1
+    next_second = per_second
+    k = 0  # steps run, should t_max be shorter than one step
+    for k in range(1, n + 1):
+        temp = step(fsm.heater())
+        if k >= next_second - 1e-9:  # Seconds_Tick
+            next_second += per_second
+            fsm.second()
+        if k % every == 0:           # a temperature line from the PC
+            fsm.receive(temp)
+            ts.append(k * dt)
+            temps.append(temp)
+            states.append(fsm.state)
+            duties.append(fsm.pwm_duty)
+        if k == stop_n:
+            fsm.stop()
+        fsm.step()
+        if fsm.state != state:
+            state = fsm.state
+            events.append((k * dt, STATE_NAMES[state]))
+            if state in (IDLE, ABORT):
+                break
+    return Run(np.array(ts), np.array(temps), np.array(states, dtype=np.int8), np.array(duties, dtype=np.int16),
+               events, state == ABORT, stop_n >= 0 and k >= stop_n, time.perf_counter() - wall)
+
+def plot_run(run, title=""):
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(10, 5))
+    ax.plot(run.t, run.temp, label="oven (C)")
+    ax.plot(run.t, run.duty, label="pwm_duty (%)", alpha=0.5)
+    for t, name in run.events:
+        ax.axvline(t, color="gray", lw=0.5)
+        ax.text(t, ax.get_ylim()[1], name, rotation=90, va="top", fontsize=8)
+    ax.set_xlabel("Time since GO (s)")
+    ax.set_title(title or run.summary())
+    ax.legend()
+    plt.show()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reflow FSM of integrated.asm on a first-order oven model")
+    parser.add_argument("--temp-soak", type=int, default=150)
+    parser.add_argument("--time-soak", type=int, default=90)
+    parser.add_argument("--temp-reflow", type=int, default=220)
+    parser.add_argument("--time-reflow", type=int, default=60)
+    parser.add_argument("--hold-duty", type=int, default=HOLD_DUTY, help="pwm_duty in SOAK and REFLOW (%%)")
+    parser.add_argument("--ambient", type=float, default=22.0, help="C")
+    parser.add_argument("--gain", type=float, default=300.0, help="C above ambient at 100%% heater")
+    parser.add_argument("--tau", type=float, default=200.0, help="oven time constant (s)")
+    parser.add_argument("--dead-time", type=float, default=8.0, help="heater to thermocouple delay (s)")
+    parser.add_argument("--sample-period", type=float, default=0.5, help="seconds between temperatures sent")
+    parser.add_argument("--stop-at", type=float, help="press STOP this many seconds after GO")
+    parser.add_argument("--plot", action="store_true")
+    args = parser.parse_args()
+
+    oven = Oven(args.ambient, args.gain, args.tau, args.dead_time)
+    run = simulate(args.temp_soak, args.time_soak, args.temp_reflow, args.time_reflow, args.hold_duty, oven,
+                   sample_period=args.sample_period, stop_at=args.stop_at)
+    for t, name in run.events:
+        print(f"{t:7.1f} s  {name}")
+    print(run.summary())
+    if args.plot:
+        plot_run(run)
@@ -0,0 +1,85 @@
+"""
+replay.py: Rerun a recorded reflow run through the final_python.py pipeline.
+
+Tuning OPAMP_GAIN, OPAMP_OFFSET_V or DELTA_LIMIT_C against the oven takes a
+full 6+ minute cycle per try.  With CAPTURE_RAW set, final_python.py records
+the raw streams (DMM volts and every DE10 ADC0 count, with their times);
+replay.py feeds such a capture through the same conversion, delta limiter and
+plotting code with the settings given on the command line, as fast as
+possible or at N x real time, and prints how far the op-amp temperature was
+from the meter.  A run log from LOG_BINARY can be replayed too, but its meter
+readings are already in C, so --cj does not apply to them.
+
+python replay.py reflow_raw.csv                                 # as fast as possible, with the plot
+python replay.py reflow_raw.csv --speed 10                      # 10 x real time
+python replay.py reflow_raw.csv --headless --gain 201.5 --offset 0.004 --no-limiter
+python replay.py reflow_raw.csv --headless --out replayed.csv   # every sample to a CSV file
+
+"""
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "FINAL_BONUS_FEATURES"))
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded reflow run through final_python.py")
+    parser.add_argument("capture", help="CAPTURE_RAW .csv file or LOG_BINARY .rlog file")
+    parser.add_argument("--speed", type=float, default=0.0, help="N x real time (default: as fast as possible)")
+    parser.add_argument("--headless", action="store_true", help="no plot, only the summary")
+    parser.add_argument("--gain", type=float, help="OPAMP_GAIN")
+    parser.add_argument("--offset", type=float, help="OPAMP_OFFSET_V")
+    parser.add_argument("--delta-limit", type=float, help="DELTA_LIMIT_C")
+    parser.add_argument("--no-limiter", action="store_true", help="ENABLE_DELTA_LIMITER = False")
+    parser.add_argument("--cj", type=float, help="CJ_TEMP_C")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for the delta limiter")
+    parser.add_argument("--out", help="write t, meter_temp, opamp_temp, delta for every sample to this CSV file")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print every sample")
+    args = parser.parse_args()
+
+    import numpy as np
+    import final_python as fp
+
+    if args.gain is not None:
+        fp.OPAMP_GAIN = args.gain
+    if args.offset is not None:
+        fp.OPAMP_OFFSET_V = args.offset
+    if args.delta_limit is not None:
+        fp.DELTA_LIMIT_C = args.delta_limit
+    if args.no_limiter:
+        fp.ENABLE_DELTA_LIMITER = False
+    if args.cj is not None:
+        fp.CJ_TEMP_C = args.cj
+
+    events = fp.load_capture(args.capture)
+    wall = time.perf_counter()
+    result = fp.replay_capture(events, speed=args.speed, headless=args.headless,
+                               seed=args.seed, verbose=args.verbose)
+    wall = time.perf_counter() - wall
+
+    if args.out:
+        np.savetxt(args.out, result, delimiter=",", fmt="%.4f",
+                   header="t,meter_temp,opamp_temp,delta", comments="")
+
+    print(f"Settings:   OPAMP_GAIN {fp.OPAMP_GAIN}  OPAMP_OFFSET_V {fp.OPAMP_OFFSET_V}  "
+          f"DELTA_LIMIT_C {fp.DELTA_LIMIT_C if fp.ENABLE_DELTA_LIMITER else 'off'}  CJ_TEMP_C {fp.CJ_TEMP_C}")
+    if len(result) == 0:
+        print("No samples: the capture has no multimeter readings.")
+        return 1
+    t, meter, opamp, delta = result.T
+    print(f"Samples:    {len(result)} over {t[-1] - t[0]:.1f} s, replayed in {wall:.2f} s "
+          f"({(t[-1] - t[0]) / wall:.0f} x real time)")
+    print(f"Meter:      max {np.nanmax(meter):6.1f} C")
+    print(f"Op-amp:     max {np.nanmax(opamp):6.1f} C")
+    print(f"|delta|:    mean {np.nanmean(delta):.2f}  p95 {np.nanpercentile(delta, 95):.2f}  "
+          f"max {np.nanmax(delta):.2f} C")
+
+    if not args.headless:
+        fp.plt.ioff()
+        fp.plt.show()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+ringbuffer.py: Fixed-capacity NumPy ring buffer for the live reflow plot.
+
+The plot loops used to append to unbounded deques and rebuild the full arrays
+(np.asarray, np.column_stack, np.concatenate) on every frame, so each frame cost
+O(samples so far).  RingBuffer allocates everything once:
+
+  - every column is stored twice, at i and i + capacity, so the newest n
+    samples are always one contiguous slice: view() returns it without copying.
+  - the line segments for one column are kept the same way, one new segment
+    ((x[i-1], y[i-1]), (x[i], y[i])) per append, so segments() is also a view
+    that can go straight to LineCollection.set_segments().
+
+When the buffer is full the oldest samples are overwritten.
+
+To use in your Python program:
+
+from ringbuffer import RingBuffer
+
+buf = RingBuffer(65536, ncols=3, seg_col=1)   # columns: t, meter, opamp
+buf.append(t, meter_temp, opamp_temp)
+n = buf.count_since(t - FINAL_WINDOW)
+lc.set_segments(buf.segments(n))
+lc.set_array(buf.view(1, n)[:-1])
+
+"""
+import numpy as np
+
+class RingBuffer:
+    def __init__(self, capacity, ncols=2, seg_col=1):
+        """
+        capacity samples of ncols columns each. Column 0 is the x axis (time,
+        increasing); seg_col is the column the line segments are built from
+        (None for no segments).
+        """
+        self.capacity = capacity
+        self.ncols = ncols
+        self.seg_col = seg_col
+        self.data = np.full((ncols, 2 * capacity), np.nan)
+        self.segs = None if seg_col is None else np.full((2 * capacity, 2, 2), np.nan)
+        self.head = 0   # where the next sample goes (0..capacity-1)
+        self.count = 0  # samples held (0..capacity)
+
+    def __len__(self):
+        return self.count
+
+    def append(self, *values):
+        i = self.head
+        j = i + self.capacity
+        data = self.data
+        if self.segs is not None:
+            x, y = values[0], values[self.seg_col]
+            if self.count:
+                prev = j - 1  # the newest sample so far is always at head-1 in the upper copy
+                seg = ((data[0, prev], data[self.seg_col, prev]), (x, y))
+            else:
+                seg = ((x, y), (x, y))
+            self.segs[i] = seg
+            self.segs[j] = seg
+        for c in range(self.ncols):
+            data[c, i] = values[c]
+            data[c, j] = values[c]
+        self.head = (i + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def view(self, col, n=None):
+        """The newest n samples (default: all) of column col, oldest first, as a view."""
+        if n is None or n > self.count:
+            n = self.count
+        end = self.head + self.capacity
+        return self.data[col, end - n:end]
+
+    def segments(self, n=None):
+        """The n - 1 segments joining the newest n samples of seg_col, as a view."""
+        if n is None or n > self.count:
+            n = self.count
+        end = self.head + self.capacity
+        return self.segs[end - n + 1:end] if n > 1 else self.segs[end:end]
+
+    def count_since(self, x_from):
+        """How many of the newest samples have column 0 >= x_from."""
+        xs = self.view(0)
+        return self.count - int(np.searchsorted(xs, x_from, side="left"))
+
+    def last(self, col):
+        return self.data[col, self.head + self.capacity - 1] if self.count else None
@@ -0,0 +1,146 @@
+"""
+runlog.py: Compact binary log of a reflow run, with a memory-mapped reader.
+
+File layout (little-endian):
+
+  header, HEADER_SIZE bytes:
+    8s  magic          b"REFLOG\\x00\\x01"
+    H   record size    bytes per record (RECORD_SIZE)
+    H   ADC_BITS
+    d   start time     time.time() when the run started
+    f   cold junction temperature (C)
+    f   ADC_VREF (V)
+    f   OPAMP_GAIN
+    f   OPAMP_OFFSET_V (V)
+    ... zero padding up to HEADER_SIZE
+
+  records, RECORD_SIZE bytes each, back to back until the end of the file:
+    f   t             seconds since the start time
+    f   meter_temp    C
+    H   adc0          raw ADC0 counts
+    f   opamp_temp    C (after the delta limiter)
+
+A 6 minute run at 10 samples/s is about 50 kB, and open_run() maps the file
+instead of reading it, so even a multi-hour run opens in milliseconds.  If the
+writer was killed mid-record, the partial record at the end is ignored.
+
+To use in your Python program:
+
+import runlog
+
+log = runlog.RunLogWriter("run.rlog", CJ_TEMP_C, ADC_BITS, ADC_VREF, OPAMP_GAIN, OPAMP_OFFSET_V)
+log.write(t, meter_temp, last_adc0, opamp_temp_limited)
+...
+run = runlog.open_run("run.rlog")
+print(run.header["cj_temp"], run.t[-1], run.meter_temp.max())
+
+To print a summary of a run from the command line:
+
+python runlog.py run.rlog
+
+"""
+import atexit
+import struct
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # only open_run() needs NumPy
+
+MAGIC = b"REFLOG\x00\x01"
+HEADER_FORMAT = "<8sHHdffff"
+HEADER_SIZE = 64
+RECORD_FORMAT = "<ffHf"
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+
+class RunLogWriter:
+    def __init__(self, filename, cj_temp, adc_bits, adc_vref, opamp_gain, opamp_offset_v,
+                 start_time=None):
+        self.file = open(filename, "wb", buffering=64 * 1024)
+        if start_time is None:
+            start_time = time.time()
+        header = struct.pack(HEADER_FORMAT, MAGIC, RECORD_SIZE, adc_bits, start_time,
+                             cj_temp, adc_vref, opamp_gain, opamp_offset_v)
+        self.file.write(header.ljust(HEADER_SIZE, b"\x00"))
+        self.record = struct.Struct(RECORD_FORMAT)
+        atexit.register(self.close)
+
+    def write(self, t, meter_temp, adc0, opamp_temp):
+        self.file.write(self.record.pack(t, meter_temp, adc0 & 0xFFFF, opamp_temp))
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.file.close()
+        atexit.unregister(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+RECORD_DTYPE = None if np is None else np.dtype(
+    [("t", "<f4"), ("meter_temp", "<f4"), ("adc0", "<u2"), ("opamp_temp", "<f4")])
+
+class RunLog:
+    """
+    A run opened with open_run(). header is a dict; records is the np.memmap of
+    all records, and t, meter_temp, adc0 and opamp_temp are views into it.
+    """
+    def __init__(self, header, records):
+        self.header = header
+        self.records = records
+        self.t = records["t"]
+        self.meter_temp = records["meter_temp"]
+        self.adc0 = records["adc0"]
+        self.opamp_temp = records["opamp_temp"]
+
+    def __len__(self):
+        return len(self.records)
+
+def read_header(filename):
+    with open(filename, "rb") as f:
+        raw = f.read(HEADER_SIZE)
+    if len(raw) < HEADER_SIZE or raw[:8] != MAGIC:
+        raise ValueError(f"{filename} is not a run log")
+    (_, record_size, adc_bits, start_time, cj_temp,
+     adc_vref, opamp_gain, opamp_offset_v) = struct.unpack_from(HEADER_FORMAT, raw)
+    if record_size != RECORD_SIZE:
+        raise ValueError(f"{filename}: unsupported record size {record_size}")
+    return {"start_time": start_time, "cj_temp": cj_temp, "adc_bits": adc_bits,
+            "adc_vref": adc_vref, "opamp_gain": opamp_gain, "opamp_offset_v": opamp_offset_v}
+
+def open_run(filename):
+    header = read_header(filename)
+    with open(filename, "rb") as f:
+        f.seek(0, 2)
+        count = (f.tell() - HEADER_SIZE) // RECORD_SIZE
+    if count == 0:
+        records = np.zeros(0, dtype=RECORD_DTYPE)
+    else:
+        records = np.memmap(filename, dtype=RECORD_DTYPE, mode="r", offset=HEADER_SIZE, shape=(count,))
+    return RunLog(header, records)
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print("Usage: python runlog.py run.rlog")
+        sys.exit(1)
+    run = open_run(sys.argv[1])
+    h = run.header
+    print("Started:        ", time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(h["start_time"])))
+    print("Cold junction:  ", round(h["cj_temp"], 2), "C")
+    print("ADC:            ", h["adc_bits"], "bits,", round(h["adc_vref"], 3), "V ref")
+    print("Op-amp:          gain", round(h["opamp_gain"], 3), "offset", round(h["opamp_offset_v"], 4), "V")
+    print("Records:        ", len(run))
+    if len(run):
+        print("Duration:       ", round(float(run.t[-1]), 1), "s")
+        print("Meter temp:      min", round(float(np.nanmin(run.meter_temp)), 1),
+              "max", round(float(np.nanmax(run.meter_temp)), 1), "C")
+        print("Op-amp temp:     min", round(float(np.nanmin(run.opamp_temp)), 1),
+              "max", round(float(np.nanmax(run.opamp_temp)), 1), "C")
@@ -0,0 +1,79 @@
+"""
+serial_reader.py: Background reader threads for the multimeter and DE10 serial ports.
+
+Each port gets its own thread that keeps calling a read function (for example
+read_meter_vdc() or read_de10_stream() from the acquisition scripts) and pushes
+(timestamp, sample) pairs into a bounded deque.  The main loop never waits on a
+port: it drains whatever arrived since the last pass, or only looks at the
+newest sample.  A slow multimeter reply then only delays the multimeter thread.
+
+To use in your Python program:
+
+import threading
+import serial_reader
+
+new_data = threading.Event()
+meter = serial_reader.SerialReader("meter", lambda: read_meter_vdc(ser), wake=new_data)
+meter.start()
+while True:
+    new_data.wait(0.05)
+    new_data.clear()
+    for t, v in meter.drain():
+        print(t, v)
+
+"""
+import collections
+import threading
+import time
+
+class SerialReader(threading.Thread):
+    def __init__(self, name, read_func, maxlen=4096, wake=None):
+        """
+        read_func() is called over and over from the thread. It should block for
+        at most the port timeout and return one sample, or None if nothing came in.
+        wake (a threading.Event) is set after every new sample so the consumer
+        can sleep until there is something to do.
+        """
+        threading.Thread.__init__(self, name=name, daemon=True)
+        self.read_func = read_func
+        self.wake = wake
+        # deque.append() and deque.popleft() are atomic, so no lock is needed
+        # between this thread and the consumer. When the consumer falls behind,
+        # the oldest samples are dropped first.
+        self.samples = collections.deque(maxlen=maxlen)
+        self.running = True
+        self.error = None  # the exception of the last read_func() call if it raised (port gone), else None
+
+    def run(self):
+        while self.running:
+            try:
+                sample = self.read_func()
+                self.error = None  # the port works again
+            except Exception as e:
+                self.error = e
+                sample = None
+                time.sleep(0.1)  # port gone: don't spin on the exception
+            if sample is None:
+                continue
+            self.samples.append((time.time(), sample))
+            if self.wake is not None:
+                self.wake.set()
+
+    def drain(self):
+        """Returns every (timestamp, sample) received since the last drain(), oldest first."""
+        out = []
+        while True:
+            try:
+                out.append(self.samples.popleft())
+            except IndexError:
+                return out
+
+    def latest(self):
+        """Returns the newest (timestamp, sample) without removing it, or None."""
+        try:
+            return self.samples[-1]
+        except IndexError:
+            return None
+
+    def stop(self):
+        self.running = False
@@ -0,0 +1,276 @@
+"""
+sim_devices.py: Simulated multimeter and DE10 serial devices for load testing.
+
+Each device sits on the master side of a pseudo-terminal; the acquisition
+scripts open the slave side (printed at start-up) exactly like a COM port, so
+nothing in them has to change except the port name.  This needs a POSIX system
+(Linux/macOS); on Windows pair two ports with com0com instead.
+
+SimDMM speaks the Fluke 45 / Tek DMM40xx subset used by open_meter(),
+read_meter_vdc() and FindPort():
+    \\x03                  -> "=>"
+    VDC; RATE S; *IDN?    -> identification line, "=>"
+    MEAS1?                -> voltage after meas_delay seconds, "=>"
+    anything else         -> "?>"
+Commands are executed one after the other, so queries can be queued.
+The voltage is the thermocouple voltage of a simulated reflow profile.
+
+SimDE10 streams "A0=HHLL" lines (ADC0 counts for the same profile through the
+op-amp chain) at a configurable rate, or with binary=True the 5-byte frames of
+firmware assembled with ADC0_BINARY = 1 (see de10_stream.py), and, like the
+firmware, echoes every temperature line it receives as "ddd.d".  The period can be jittered and a
+fraction of the lines corrupted (byte dropped, byte replaced or line cut short).
+
+Run from the command line (Ctrl+C to stop), 100x the real DE10 rate and a
+DMM that answers in 10 ms:
+
+python sim_devices.py --de10-rate 1000 --dmm-delay 0.01 --jitter 0.2 --corrupt 0.01
+
+or from a test program:
+
+import sim_devices
+dmm = sim_devices.SimDMM(meas_delay=0.01); dmm.start()
+de10 = sim_devices.SimDE10(rate=1000); de10.start()
+METER_PORT, DE10_PORT = dmm.port, de10.port
+
+"""
+import argparse
+import os
+import pty
+import queue
+import random
+import select
+import threading
+import time
+import tty
+
+import kconvert
+from de10_stream import make_frame
+
+def reflow_profile(t):
+    """Oven temperature (C) t seconds into a typical reflow run."""
+    if t < 80:
+        return 25.0 + 1.5 * t              # preheat to 145 C
+    if t < 170:
+        return 145.0 + (t - 80) * 0.4      # soak to 181 C
+    if t < 210:
+        return 181.0 + (t - 170) * 1.0     # ramp to 221 C
+    if t < 250:
+        return 221.0 + 4.0 * ((t - 210) / 40.0) * (1 - (t - 210) / 40.0)  # reflow, ~1 C overshoot
+    return max(25.0, 221.0 - (t - 250) * 1.2)  # cool
+
+def reflow_state(t):
+    """fsm_state (1 preheat .. 5 cool) t seconds into the run of reflow_profile()."""
+    for state, end in ((1, 80), (2, 170), (3, 210), (4, 250)):
+        if t < end:
+            return state
+    return 5
+
+def open_pty():
+    """Returns (master fd, slave fd, slave path) of a raw pseudo-terminal."""
+    master, slave = pty.openpty()
+    tty.setraw(slave)  # no echo, no CR/LF translation
+    return master, slave, os.ttyname(slave)
+
+class SimDevice(threading.Thread):
+    def __init__(self, name, speed=1.0, cj_temp=22.0, profile=reflow_profile, baud=None):
+        """
+        baud: if set, data takes as long to go either way as it would on a real
+        link at that rate (10 bits per byte), so round trips cost what they do
+        on the hardware.
+        """
+        threading.Thread.__init__(self, name=name, daemon=True)
+        self.baud = baud
+        self.rx_queue = queue.Queue()  # (time the data has fully arrived, data), with baud set
+        self.rx_link_free = 0.0
+        self.master, self.slave, self.port = open_pty()
+        self.speed = speed
+        self.cj_temp = cj_temp
+        self.profile = profile
+        self.start_time = time.monotonic()
+        self.running = True
+        self.rx = b""
+
+    def time_now(self):
+        return (time.monotonic() - self.start_time) * self.speed
+
+    def temp_now(self):
+        return self.profile(self.time_now())
+
+    def tc_mV_now(self):
+        """Thermocouple voltage: hot junction at the profile temperature, cold junction at cj_temp."""
+        return kconvert.C_to_mV(self.temp_now()) - kconvert.C_to_mV(self.cj_temp)
+
+    def send(self, data):
+        if self.baud:
+            time.sleep(len(data) * 10.0 / self.baud)  # start + 8 data + stop bits per byte
+        os.write(self.master, data)
+
+    def start(self):
+        threading.Thread.start(self)
+        if self.baud:
+            threading.Thread(target=self.rx_link, name=self.name + "-rx", daemon=True).start()
+
+    def rx_link(self):
+        """With baud set: timestamps incoming data with when it would have finished arriving."""
+        while self.running:
+            r, _, _ = select.select([self.master], [], [], 0.1)
+            if r:
+                data = os.read(self.master, 4096)
+                self.rx_link_free = max(self.rx_link_free, time.monotonic()) + len(data) * 10.0 / self.baud
+                self.rx_queue.put((self.rx_link_free, data))
+
+    def receive(self, timeout):
+        """Waits up to timeout seconds for input and appends it to self.rx."""
+        if self.baud:
+            try:
+                arrived, data = self.rx_queue.get(timeout=max(0.0, timeout))
+            except queue.Empty:
+                return False
+            time.sleep(max(0.0, arrived - time.monotonic()))
+            self.rx += data
+            return True
+        r, _, _ = select.select([self.master], [], [], max(0.0, timeout))
+        if r:
+            self.rx += os.read(self.master, 4096)
+            return True
+        return False
+
+    def stop(self):
+        self.running = False
+
+RATE_DELAYS = {b"S": 0.4, b"M": 0.2, b"F": 0.05}  # seconds per reading at RATE S/M/F
+
+class SimDMM(SimDevice):
+    def __init__(self, meas_delay=0.3, idn=b"FLUKE, 45, 0, 1.7 D1.0", follow_rate=False, **kwargs):
+        """With follow_rate, RATE S/M/F sets meas_delay to the real meter's reading rate."""
+        SimDevice.__init__(self, "sim-dmm", **kwargs)
+        self.meas_delay = meas_delay
+        self.follow_rate = follow_rate
+        self.idn = idn
+        self.queries = 0
+
+    def run(self):
+        while self.running:
+            if not self.receive(0.1):
+                continue
+            while True:
+                if self.rx.startswith(b"\x03"):
+                    self.rx = self.rx[1:]
+                    self.send(b"=>\r\n")
+                    continue
+                end = self.rx.find(b"\n")
+                if end < 0:
+                    break
+                line, self.rx = self.rx[:end], self.rx[end + 1:]
+                self.command(line.strip(b"\r\x03 "))
+
+    def command(self, line):
+        prompt = b"=>\r\n"
+        for cmd in line.split(b";"):
+            cmd = cmd.strip().upper()
+            if cmd == b"*IDN?":
+                self.send(self.idn + b"\r\n")
+            elif cmd in (b"MEAS1?", b"MEAS?", b"VAL1?", b"VAL?"):
+                time.sleep(self.meas_delay)
+                self.queries += 1
+                self.send(b"%+.5E\r\n" % (self.tc_mV_now() / 1000.0))
+            elif cmd.startswith(b"RATE ") and cmd[5:] in RATE_DELAYS:
+                if self.follow_rate:
+                    self.meas_delay = RATE_DELAYS[cmd[5:]]
+            elif cmd not in (b"", b"VDC"):
+                prompt = b"?>\r\n"  # command error, like the real meter
+        self.send(prompt)
+
+class SimDE10(SimDevice):
+    def __init__(self, rate=10.0, jitter=0.0, corrupt=0.0, echo=True, binary=False,
+                 opamp_gain=1.0, opamp_offset_v=0.0, adc_vref=3.3, adc_bits=12, **kwargs):
+        SimDevice.__init__(self, "sim-de10", **kwargs)
+        self.rate = rate
+        self.binary = binary
+        self.jitter = jitter
+        self.corrupt = corrupt
+        self.echo = echo
+        self.opamp_gain = opamp_gain
+        self.opamp_offset_v = opamp_offset_v
+        self.adc_vref = adc_vref
+        self.max_counts = (1 << adc_bits) - 1
+        self.sent = 0
+        self.received = 0
+
+    def adc_counts_now(self):
+        opamp_v = self.tc_mV_now() / 1000.0 * self.opamp_gain + self.opamp_offset_v
+        counts = int(round(opamp_v / self.adc_vref * self.max_counts))
+        return min(max(counts, 0), self.max_counts)
+
+    def mangle(self, frame):
+        i = random.randrange(len(frame) if self.binary else len(frame) - 2)  # not the CR LF
+        kind = random.randrange(3)
+        if kind == 0:
+            return frame[:i] + frame[i + 1:]                                # byte dropped
+        if kind == 1:
+            return frame[:i] + bytes([random.randrange(32, 127)]) + frame[i + 1:]  # byte replaced
+        return frame[:i]                                                    # line/frame cut short
+
+    def run(self):
+        next_time = time.monotonic()
+        while self.running:
+            # Handle temperature lines from the host until the next frame is due
+            while self.receive(next_time - time.monotonic()):
+                self.handle_rx()
+                if time.monotonic() >= next_time:
+                    break
+            if self.binary:
+                frame = make_frame(self.adc_counts_now(), reflow_state(self.time_now()))
+            else:
+                frame = b"A0=%04X\r\n" % self.adc_counts_now()
+            if self.corrupt and random.random() < self.corrupt:
+                frame = self.mangle(frame)
+            self.send(frame)
+            self.sent += 1
+            period = 1.0 / self.rate
+            if self.jitter:
+                period *= 1.0 + random.uniform(-self.jitter, self.jitter)
+            next_time = max(next_time + period, time.monotonic() - 1.0)
+
+    def handle_rx(self):
+        lines = self.rx.replace(b"\r", b"\n").split(b"\n")
+        self.rx = lines.pop()
+        for line in lines:
+            if not line:
+                continue
+            self.received += 1
+            if self.echo:
+                # Same as the firmware: integer part clamped to 0..255, first decimal
+                try:
+                    value = float(line)
+                except ValueError:
+                    continue
+                value = min(max(value, 0.0), 255.9)
+                self.send(b"%d.%d\r\n" % (int(value), int(value * 10) % 10))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Simulated multimeter and DE10 serial devices")
+    parser.add_argument("--dmm-delay", type=float, default=0.3, help="seconds per MEAS1? reply")
+    parser.add_argument("--dmm-follow-rate", action="store_true", help="take the reply time from RATE S/M/F instead")
+    parser.add_argument("--de10-rate", type=float, default=10.0, help="A0= lines per second")
+    parser.add_argument("--jitter", type=float, default=0.0, help="DE10 period jitter, fraction of the period")
+    parser.add_argument("--corrupt", type=float, default=0.0, help="fraction of DE10 lines to corrupt")
+    parser.add_argument("--speed", type=float, default=1.0, help="profile time multiplier")
+    parser.add_argument("--opamp-gain", type=float, default=1.0)
+    parser.add_argument("--binary", action="store_true", help="send binary ADC0 frames (ADC0_BINARY = 1)")
+    args = parser.parse_args()
+
+    dmm = SimDMM(meas_delay=args.dmm_delay, follow_rate=args.dmm_follow_rate, speed=args.speed)
+    de10 = SimDE10(rate=args.de10_rate, jitter=args.jitter, corrupt=args.corrupt, binary=args.binary,
+                   opamp_gain=args.opamp_gain, speed=args.speed)
+    dmm.start()
+    de10.start()
+    print(f"METER_PORT = {dmm.port!r}")
+    print(f"DE10_PORT  = {de10.port!r}")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"DMM queries: {dmm.queries}  DE10 lines sent: {de10.sent}  received: {de10.received}")
+    except KeyboardInterrupt:
+        pass
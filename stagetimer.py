@@ -0,0 +1,131 @@
+"""
+stagetimer.py: Per-stage latency statistics for the acquisition loops.
+
+Each stage (meter read, DE10 read, kconvert, write-back, draw, ...) keeps the
+last WINDOW durations in a fixed ring of time.perf_counter_ns() differences,
+so recording one costs a subtraction and an array store (well under a
+microsecond) and the memory never grows.  The percentiles are only worked out
+when a report is asked for, so the timers can stay on during real runs.
+
+Stages can be recorded from any thread, as long as each stage is only
+recorded from one thread (the reader threads time their own reads).
+
+The report (count, p50/p95/p99 and max per stage, in ms) is printed:
+  - at exit, after dump_on_exit()
+  - on SIGUSR1 (kill -USR1 <pid>), or Ctrl+Break on Windows, after dump_on_signal()
+  - whenever the script calls dump(), e.g. from a key binding
+
+To use in your Python program:
+
+from stagetimer import StageTimer
+
+timer = StageTimer()
+timer.dump_on_exit()
+while True:
+    t0 = timer.now()
+    v = read_meter_vdc(ser)
+    t1 = timer.lap("meter read", t0)      # records t1 - t0, returns t1
+    temp = kconvert.mV_to_C(v * 1000.0, cj)
+    timer.lap("kconvert", t1)
+    timer.record("sample->write-back", ns)  # or record a duration measured elsewhere
+
+"""
+import array
+import atexit
+import signal
+import sys
+import time
+
+WINDOW = 4096  # durations kept per stage
+
+class StageStats:
+    def __init__(self, window=WINDOW):
+        self.samples = array.array("q", bytes(8 * window))
+        self.window = window
+        self.count = 0   # all-time
+        self.max = 0     # all-time
+
+    def add(self, ns):
+        self.samples[self.count % self.window] = ns
+        self.count += 1
+        if ns > self.max:
+            self.max = ns
+
+    def percentiles(self, ps=(50, 95, 99)):
+        """Percentiles (ns) of the durations still in the window."""
+        n = min(self.count, self.window)
+        if n == 0:
+            return [0] * len(ps)
+        ordered = sorted(self.samples[:n])
+        return [ordered[min(n - 1, int(p / 100.0 * n))] for p in ps]
+
+class StageTimer:
+    def __init__(self, window=WINDOW, enabled=True):
+        self.window = window
+        self.enabled = enabled
+        self.stages = {}  # name -> StageStats, in the order the stages were first seen
+        self.started = time.perf_counter_ns()
+
+    now = staticmethod(time.perf_counter_ns)
+
+    def record(self, name, ns):
+        if not self.enabled:
+            return
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = StageStats(self.window)
+        stats.add(ns)
+
+    def lap(self, name, t0):
+        """Records now - t0 as a duration of stage name and returns now."""
+        t1 = time.perf_counter_ns()
+        self.record(name, t1 - t0)
+        return t1
+
+    def timed(self, name, func):
+        """Wraps func so every call is recorded as a duration of stage name."""
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(name, time.perf_counter_ns() - t0)
+        return wrapper
+
+    def report(self):
+        elapsed = (time.perf_counter_ns() - self.started) / 1e9
+        lines = [f"Stage timings over the last {self.window} samples per stage (ms), "
+                 f"{elapsed:.0f} s since start:",
+                 f"  {'stage':24s} {'count':>8s} {'p50':>9s} {'p95':>9s} {'p99':>9s} {'max':>9s}"]
+        for name, stats in list(self.stages.items()):
+            p50, p95, p99 = stats.percentiles()
+            lines.append(f"  {name:24s} {stats.count:8d} {p50 / 1e6:9.3f} {p95 / 1e6:9.3f} "
+                         f"{p99 / 1e6:9.3f} {stats.max / 1e6:9.3f}")
+        return "\n".join(lines)
+
+    def dump(self, file=None):
+        if self.enabled and self.stages:
+            print(self.report(), file=file or sys.stderr, flush=True)
+
+    def dump_on_exit(self):
+        atexit.register(self.dump)
+
+    def dump_on_signal(self):
+        """SIGUSR1 (POSIX) or SIGBREAK (Ctrl+Break, Windows) prints the report. Call from the main thread."""
+        sig = getattr(signal, "SIGUSR1", None) or getattr(signal, "SIGBREAK", None)
+        if sig is not None:
+            signal.signal(sig, lambda signum, frame: self.dump())
+
+if __name__ == '__main__':
+    # Self-test: overhead of one record and the report layout
+    timer = StageTimer()
+    n = 200000
+    t0 = time.perf_counter_ns()
+    for _ in range(n):
+        t1 = timer.now()
+        timer.lap("empty stage", t1)
+    per_lap = (time.perf_counter_ns() - t0) / n
+    for ms in (1, 2, 3, 50):
+        timer.record("sleep", int(ms * 1e6))
+    print(timer.report())
+    print(f"Overhead: {per_lap:.0f} ns per now() + lap()")
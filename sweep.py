@@ -0,0 +1,226 @@
+"""
+sweep.py: Parallel parameter sweep of reflow profiles on the simulated oven.
+
+temp_soak, time_soak, temp_reflow and time_reflow are tuned one oven run (and
+a round of NEC remote presses) at a time.  sweep.py runs every combination
+of the values given (or a random sample of them) through reflow_sim.simulate()
+across a process pool, together with the oven-model constants, so a few
+hundred profiles take seconds.  Each point is scored on:
+
+  peak         highest oven temperature (C)
+  tal          time above liquidus, LIQUIDUS_C (s)
+  ramp_up      steepest heating over RAMP_WINDOW seconds (C/s)
+  ramp_down    steepest cooling over RAMP_WINDOW seconds (C/s, positive)
+  ok           finished (no ABORT) with peak, tal and both ramps within SPEC
+
+and every point is one row of a single CSV table, in the order of the grid,
+with the outcome and the time in each state.
+
+Each parameter takes a list "130,150,170" or a range "130:170:10" (end
+included).  With --random N, N points are drawn uniformly between the lowest
+and highest value of each parameter instead (integers for the firmware
+settings, which are bytes on the DE10).
+
+python sweep.py                                            # the UI's 3 x 3 x 3 x 3 profiles
+python sweep.py --temp-soak 130:180:5 --temp-reflow 200:250:5 --out sweep.csv
+python sweep.py --random 500 --gain 250,350 --tau 150,250 --dead-time 4,12 --workers 8
+python sweep.py --liquidus 183 --spec-peak 205,225          # SnPb paste
+
+To use in your Python program:
+
+import sweep
+
+points = sweep.grid(temp_soak=[130, 150, 170], time_soak=[60, 90], gain=[280.0, 320.0])
+for point, score in zip(points, sweep.run_sweep(points, workers=4)):
+    print(point, score["peak"], score["tal"], score["ok"])
+
+"""
+import argparse
+import itertools
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import reflow_sim
+from csvlog import CSVLogger
+
+LIQUIDUS_C = 217.0      # SAC305 lead-free paste
+RAMP_WINDOW = 5.0       # seconds the ramp rates are measured over
+SPEC = {                # (min, max) for an acceptable profile
+    "peak": (235.0, 250.0),
+    "tal": (30.0, 90.0),
+    "ramp_up": (0.0, 3.0),
+    "ramp_down": (0.0, 6.0),
+}
+
+# Parameter -> default values: the firmware settings offered by the UI, the oven as in reflow_sim.Oven()
+PARAMS = {
+    "temp_soak": reflow_sim.TEMP_SOAK_OPTIONS,
+    "time_soak": reflow_sim.TIME_SOAK_OPTIONS,
+    "temp_reflow": reflow_sim.TEMP_REFLOW_OPTIONS,
+    "time_reflow": reflow_sim.TIME_REFLOW_OPTIONS,
+    "hold_duty": (reflow_sim.HOLD_DUTY,),
+    "ambient": (22.0,),
+    "gain": (300.0,),
+    "tau": (200.0,),
+    "dead_time": (8.0,),
+}
+FIRMWARE_PARAMS = ("temp_soak", "time_soak", "temp_reflow", "time_reflow", "hold_duty")
+SCORES = ["outcome", "duration", "peak", "tal", "ramp_up", "ramp_down", "ok"] + \
+         [name.lower() + "_s" for name in reflow_sim.STATE_NAMES[1:6]]
+
+# ============================================================
+# POINTS
+# ============================================================
+
+def grid(**values):
+    """Every combination of the values given (parameters not given keep their PARAMS default)."""
+    names = list(PARAMS)
+    lists = [values.get(name, PARAMS[name]) for name in names]
+    return [dict(zip(names, combo)) for combo in itertools.product(*lists)]
+
+def random_points(n, seed=0, **values):
+    """n points drawn uniformly between the lowest and highest value of each parameter."""
+    rng = random.Random(seed)
+    points = []
+    for _ in range(n):
+        point = {}
+        for name in PARAMS:
+            v = values.get(name, PARAMS[name])
+            lo, hi = min(v), max(v)
+            point[name] = rng.randint(int(lo), int(hi)) if name in FIRMWARE_PARAMS else rng.uniform(lo, hi)
+        points.append(point)
+    return points
+
+# ============================================================
+# SCORING
+# ============================================================
+
+def score_run(run, liquidus=LIQUIDUS_C, spec=SPEC):
+    """Peak, time above liquidus, ramp rates and pass/fail of one reflow_sim.Run."""
+    t, temp = run.t, run.temp
+    if run.aborted:
+        outcome = "abort"
+    elif run.events[-1][1] == "IDLE":
+        outcome = "done"
+    else:
+        outcome = "timeout"
+    score = {"outcome": outcome, "duration": run.duration, "peak": float(np.max(temp)) if len(temp) else math.nan}
+
+    # Time above liquidus: samples are evenly spaced, so count them
+    dt = float(t[1] - t[0]) if len(t) > 1 else 0.0
+    score["tal"] = float(np.count_nonzero(temp > liquidus)) * dt
+
+    # Ramp rates: temperature change over RAMP_WINDOW seconds
+    lag = max(1, int(round(RAMP_WINDOW / dt))) if dt else 0
+    if lag and len(temp) > lag:
+        slope = (temp[lag:] - temp[:-lag]) / (lag * dt)
+        score["ramp_up"] = max(0.0, float(np.max(slope)))
+        score["ramp_down"] = max(0.0, -float(np.min(slope)))
+    else:
+        score["ramp_up"] = score["ramp_down"] = math.nan
+
+    score["ok"] = outcome == "done" and all(lo <= score[name] <= hi for name, (lo, hi) in spec.items())
+    times = run.state_times()
+    for name in reflow_sim.STATE_NAMES[1:6]:
+        score[name.lower() + "_s"] = times.get(name, 0.0)
+    return score
+
+def evaluate(point, liquidus=LIQUIDUS_C, spec=SPEC):
+    """Simulates and scores one point (runs in a worker process)."""
+    oven = reflow_sim.Oven(point["ambient"], point["gain"], point["tau"], point["dead_time"])
+    run = reflow_sim.simulate(point["temp_soak"], point["time_soak"], point["temp_reflow"], point["time_reflow"],
+                              point["hold_duty"], oven)
+    return score_run(run, liquidus, spec)
+
+def evaluate_chunk(args):
+    points, liquidus, spec = args
+    return [evaluate(point, liquidus, spec) for point in points]
+
+def run_sweep(points, workers=None, liquidus=LIQUIDUS_C, spec=SPEC, chunk=None):
+    """
+    Scores every point across a pool of workers processes (default: one per
+    CPU) and yields the scores in the order of points, as they are ready.
+    Points are sent in chunks, so each worker process costs one round trip
+    per chunk, not per point.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunk = chunk or max(1, min(64, len(points) // (4 * workers)))
+    chunks = [(points[i:i + chunk], liquidus, spec) for i in range(0, len(points), chunk)]
+    if workers == 1:
+        for args in chunks:
+            yield from evaluate_chunk(args)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for scores in pool.map(evaluate_chunk, chunks):
+            yield from scores
+
+# ============================================================
+# MAIN
+# ============================================================
+
+def parse_values(text, integer):
+    """"130,150,170" or "130:170:10" (end included) -> list of numbers."""
+    kind = int if integer else float
+    if ":" in text:
+        start, end, step = (float(part) for part in text.split(":"))
+        n = int(math.floor((end - start) / step + 1e-9)) + 1
+        return [kind(start + i * step) for i in range(n)]
+    return [kind(part) for part in text.split(",")]
+
+def parse_range(text):
+    lo, hi = (float(part) for part in text.split(","))
+    return lo, hi
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep reflow profiles and oven constants on reflow_sim")
+    for name in PARAMS:
+        parser.add_argument("--" + name.replace("_", "-"), help=f"list or start:end:step (default {PARAMS[name]})")
+    parser.add_argument("--random", type=int, help="this many random points instead of the full grid")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for --random")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--liquidus", type=float, default=LIQUIDUS_C, help="C")
+    for name, (lo, hi) in SPEC.items():
+        parser.add_argument("--spec-" + name.replace("_", "-"), type=parse_range, default=(lo, hi),
+                            help=f"min,max (default {lo:g},{hi:g})")
+    parser.add_argument("--out", default="sweep.csv", help="results table (default sweep.csv)")
+    parser.add_argument("--top", type=int, default=10, help="print this many of the best points")
+    args = parser.parse_args()
+
+    values = {}
+    for name in PARAMS:
+        text = getattr(args, name)
+        if text is not None:
+            values[name] = parse_values(text, name in FIRMWARE_PARAMS)
+    points = random_points(args.random, args.seed, **values) if args.random else grid(**values)
+    spec = {name: getattr(args, "spec_" + name) for name in SPEC}
+    workers = args.workers or os.cpu_count() or 1
+
+    wall = time.perf_counter()
+    results = []
+    with CSVLogger(args.out, list(PARAMS) + SCORES) as table:
+        for point, score in zip(points, run_sweep(points, workers, args.liquidus, spec)):
+            row = [point[name] for name in PARAMS] + [score[name] for name in SCORES]
+            table.writerow([round(v, 3) if isinstance(v, float) else v for v in row])
+            results.append((point, score))
+    wall = time.perf_counter() - wall
+
+    simulated = sum(score["duration"] for _, score in results)
+    ok = [r for r in results if r[1]["ok"]]
+    print(f"{len(results)} profiles ({simulated / 3600:.1f} h of oven time) in {wall:.2f} s on {workers} "
+          f"process(es), {len(ok)} within spec -> {args.out}")
+
+    # Best points: within spec first, then closest to the middle of the peak window
+    mid = sum(spec["peak"]) / 2
+    results.sort(key=lambda r: (not r[1]["ok"], r[1]["outcome"] != "done", abs(r[1]["peak"] - mid)))
+    print(f"{'soak':>9s} {'reflow':>9s} {'gain':>6s} {'tau':>6s} {'dead':>5s} "
+          f"{'peak':>6s} {'TAL':>5s} {'up':>5s} {'down':>5s}  outcome")
+    for point, score in results[:args.top]:
+        print(f"{point['temp_soak']:4d}/{point['time_soak']:3d}s {point['temp_reflow']:4d}/{point['time_reflow']:3d}s "
+              f"{point['gain']:6.0f} {point['tau']:6.0f} {point['dead_time']:5.1f} "
+              f"{score['peak']:6.1f} {score['tal']:5.0f} {score['ramp_up']:5.2f} {score['ramp_down']:5.2f}  "
+              f"{score['outcome']}{' ok' if score['ok'] else ''}")
@@ -0,0 +1,113 @@
+"""
+ticker.py: Fixed-period scheduler for the acquisition loops.
+
+A loop that runs "as fast as the reads return" has no pace of its own: with
+the meter unplugged it spins at 100% CPU, and with it plugged in the sample
+times follow the DMM round trip, so they are unevenly spaced.  Ticker runs
+the loop on a fixed grid of deadlines instead:
+
+  tick k is due at start + k * period (time.monotonic()), so the loop does not
+  drift however long each tick takes, as long as it takes less than a period;
+  wait() sleeps until the next deadline, so an idle loop costs nothing;
+  a tick whose deadline has already passed when wait() is called (the last
+  one took too long) is an overrun and runs at once; ticks whose deadlines
+  passed entirely are skipped (counted in .skipped), so the loop carries on
+  with the newest one that is due and never runs a burst to catch up.
+
+wait() returns the tick's time on the grid (seconds since start), so sample
+timestamps taken from it are exactly period apart.
+
+To use in your Python program:
+
+from ticker import Ticker
+
+ticker = Ticker(0.1)            # 10 ticks per second
+while True:
+    t = ticker.wait()           # 0.0, 0.1, 0.2, ... (seconds since the first wait())
+    sample = read_everything_that_came_in()
+print(ticker.report())          # ticks, overruns, skipped ticks, worst lateness
+
+"""
+import asyncio
+import math
+import time
+
+class Ticker:
+    def __init__(self, period):
+        if period <= 0:
+            raise ValueError(f"period must be > 0, not {period!r}")
+        self.period = period
+        self.t0 = None      # monotonic time of tick 0
+        self.k = -1         # index of the last tick returned
+        self.ticks = 0      # ticks returned
+        self.overruns = 0   # ticks that were already due when wait() was called
+        self.skipped = 0    # ticks dropped by overruns
+        self.max_late = 0.0 # seconds, worst start of a tick after its deadline
+
+    def start(self, t0=None):
+        """Starts the grid at t0 (default: now). wait() does this on its first call."""
+        self.t0 = time.monotonic() if t0 is None else t0
+        self.k = -1
+
+    def next_tick(self):
+        """Moves to the next tick. Returns (its time since start, seconds to sleep until it is due)."""
+        now = time.monotonic()
+        if self.t0 is None:
+            self.start(now)
+        k = self.k + 1
+        late = now - (self.t0 + k * self.period)
+        if late > 0:
+            # Overrun: run at once, on the newest tick that is due
+            missed = int(math.floor(late / self.period))
+            self.overruns += 1
+            self.skipped += missed
+            k += missed
+            late -= missed * self.period
+        self.k = k
+        self.ticks += 1
+        self.max_late = max(self.max_late, late)
+        return k * self.period, max(0.0, -late)
+
+    def wait(self):
+        """Sleeps until the next tick is due and returns its time (seconds since start)."""
+        t, delay = self.next_tick()
+        if delay > 0:
+            time.sleep(delay)
+        return t
+
+    async def wait_async(self):
+        """wait() for asyncio code: the event loop keeps running meanwhile."""
+        t, delay = self.next_tick()
+        await asyncio.sleep(delay)
+        return t
+
+    def report(self):
+        return (f"Ticker {self.period * 1000:.0f} ms: {self.ticks} ticks, {self.overruns} overruns, "
+                f"{self.skipped} ticks skipped, worst lateness {self.max_late * 1000:.1f} ms")
+
+if __name__ == '__main__':
+    # Self-test: even spacing and no drift with uneven work, overruns with too much work
+    import random
+
+    ticker = Ticker(0.02)
+    times = []
+    cpu0, wall0 = time.process_time(), time.monotonic()
+    for i in range(100):
+        t = ticker.wait()
+        times.append((t, time.monotonic() - ticker.t0))
+        time.sleep(random.uniform(0.0, 0.015))  # work that takes up to 3/4 of the period
+    cpu, wall = time.process_time() - cpu0, time.monotonic() - wall0
+    drift = times[-1][1] - times[-1][0]
+    print(ticker.report())
+    print(f"last tick {times[-1][0]:.3f} s started at {times[-1][1]:.4f} s: drift {drift * 1000:.2f} ms, "
+          f"CPU {cpu / wall * 100:.1f}%")
+    assert ticker.overruns == 0 and drift < 0.01
+    assert all(abs(b[0] - a[0] - 0.02) < 1e-9 for a, b in zip(times, times[1:]))
+
+    ticker = Ticker(0.02)
+    for i in range(20):
+        ticker.wait()
+        time.sleep(0.05 if i % 5 == 4 else 0.0)  # every fifth tick takes 2.5 periods
+    print(ticker.report())
+    assert ticker.overruns == 3 and ticker.skipped == 3
+    print("OK")
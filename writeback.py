@@ -0,0 +1,191 @@
+"""
+writeback.py: Change-driven temperature write-back to the DE10.
+
+The loops used to write "ddd.d\\n" to the DE10 on every pass, changed or not,
+and integrated_script.py then waited on a readline() for the echo.  Every
+line costs the CV-8052 a UART interrupt and a parse, so at 10+ passes per
+second most of its time went on temperatures it already had, instead of on
+FSM_Reflow_TempBased and the LCD.  WriteBack sends a temperature only:
+
+  - when its text ("%.1f") differs from the last one sent, or
+  - when KEEPALIVE seconds have passed since the last send (so the DE10 sees
+    the link is alive, and a lost line is repaired), and
+  - at most once per MIN_INTERVAL seconds: values submitted faster than that
+    are merged and only the newest is sent, by the next submit() or poll().
+
+The echo check no longer blocks.  Each sent value is remembered; the echoes
+the DE10 sends back are handed to check_echo() whenever the reader has them,
+and matched against what was sent (the firmware clamps to 0..255.9).  Sent
+values without an echo after ECHO_TIMEOUT seconds count as missing.
+
+A write that fails (DE10 unplugged, USB glitch) is counted in .failed, with
+the exception in .error; the value stays pending and is tried again by the
+next submit() or poll(), so the loops carry on without the DE10.
+
+The methods can be called from different threads (the asyncio engine writes
+from an executor thread and checks echoes on the event loop).
+
+To use in your Python program:
+
+from writeback import WriteBack
+
+writer = WriteBack(ser2)
+while True:
+    writer.submit(temp)           # sends if changed / keepalive due, else merges
+    writer.check_echo(echoes)     # temperatures the DE10 echoed since the last pass
+    writer.poll()                 # when idle: sends a merged value or the keepalive
+print(writer.report())
+
+"""
+import collections
+import threading
+import time
+
+import serial
+
+KEEPALIVE = 1.0       # seconds: resend the current value at least this often
+MIN_INTERVAL = 0.05   # seconds between two writes (bursts are merged into the newest value)
+ECHO_TIMEOUT = 1.0    # seconds for the DE10 to echo a value
+ECHO_MAX, ECHO_STEP = 255.9, 0.05  # the firmware clamps the echo to 0..255.9, with one decimal
+
+class WriteBack:
+    def __init__(self, ser, keepalive=KEEPALIVE, min_interval=MIN_INTERVAL, echo_timeout=ECHO_TIMEOUT,
+                 clock=time.monotonic):
+        self.ser = ser
+        self.keepalive = keepalive
+        self.min_interval = min_interval
+        self.echo_timeout = echo_timeout
+        self.clock = clock
+        self.last_text = None    # text of the last line sent
+        self.last_sent = float("-inf")
+        self.pending = None      # newest value not sent yet
+        self.echoes = collections.deque()  # (time sent, value) still waiting for their echo
+        self.submitted = 0
+        self.sent = 0
+        self.keepalives = 0
+        self.unchanged = 0       # submitted values equal to the last one sent
+        self.merged = 0          # values replaced by a newer one before they were sent
+        self.echo_ok = 0
+        self.echo_bad = 0
+        self.echo_missing = 0
+        self.failed = 0          # writes that raised
+        self.error = None        # the exception of the last failed write, None once a write succeeds
+        self.lock = threading.Lock()
+
+    def submit(self, value):
+        """Offers the newest temperature. Returns True if a line was written."""
+        with self.lock:
+            self.submitted += 1
+            if self.pending is not None:
+                self.merged += 1
+            self.pending = value
+            return self.send_due()
+
+    def poll(self):
+        """Writes the pending value or the keepalive when one is due. Returns True if a line was written."""
+        with self.lock:
+            return self.send_due()
+
+    def send_due(self):
+        now = self.clock()
+        if now - self.last_sent < self.min_interval:
+            return False
+        value = self.pending
+        if value is None:
+            if self.last_text is None or now - self.last_sent < self.keepalive:
+                return False
+            self.keepalives += 1
+            text = self.last_text
+        else:
+            self.pending = None
+            text = f"{value:.1f}"
+            if text == self.last_text and now - self.last_sent < self.keepalive:
+                self.unchanged += 1
+                return False
+        try:
+            self.ser.write(text.encode() + b"\n")
+        except (serial.SerialException, OSError) as e:
+            self.failed += 1
+            self.error = e
+            if value is not None:
+                self.pending = value  # unless a newer one comes first
+            return False
+        self.error = None
+        self.last_text = text
+        self.last_sent = now
+        self.sent += 1
+        self.echoes.append((now, float(text)))
+        self.expire(now)
+        return True
+
+    def check_echo(self, temps):
+        """Matches temperatures echoed by the DE10 (oldest first) against the values sent."""
+        with self.lock:
+            self.match_echoes(temps)
+
+    def match_echoes(self, temps):
+        for temp in temps:
+            self.expire(self.clock())
+            # The echo is for the oldest value still waiting; skip values whose echo was lost
+            while self.echoes:
+                _, value = self.echoes.popleft()
+                if abs(min(max(value, 0.0), ECHO_MAX) - temp) < ECHO_STEP:
+                    self.echo_ok += 1
+                    break
+                self.echo_missing += 1
+            else:
+                self.echo_bad += 1  # an echo that matches nothing we sent
+
+    def expire(self, now):
+        while self.echoes and now - self.echoes[0][0] > self.echo_timeout:
+            self.echoes.popleft()
+            self.echo_missing += 1
+
+    def report(self):
+        return (f"Write-back: {self.sent} lines for {self.submitted} values ({self.unchanged} unchanged, "
+                f"{self.merged} merged, {self.keepalives} keepalives); echoes {self.echo_ok} ok, "
+                f"{self.echo_bad} unexpected, {self.echo_missing} missing; {self.failed} failed writes")
+
+if __name__ == '__main__':
+    # Self-test: a slowly rising temperature submitted at 100 Hz for 3 s, echoed like the firmware
+    class FakeDE10:
+        def __init__(self):
+            self.lines = []
+            self.unplugged = False
+        def write(self, data):
+            if self.unplugged:
+                raise serial.SerialException("device disconnected")
+            self.lines.append(data)
+
+    now = [0.0]
+    de10 = FakeDE10()
+    writer = WriteBack(de10, clock=lambda: now[0])
+    for i in range(300):
+        now[0] = i * 0.01
+        temp = 25.0 + (i // 50) * 0.5 if i < 200 else 27.0  # steps of 0.5 C, then constant
+        writer.submit(temp + 0.01 * (i % 3))                # jitter below the 0.1 C resolution
+        if de10.lines and i % 7 == 0:                       # echoes come in late, in batches
+            writer.check_echo([float(line) for line in de10.lines])
+            de10.lines = []
+    for i in range(300, 500):                               # no new values: keepalives only
+        now[0] = i * 0.01
+        writer.poll()
+        writer.check_echo([float(line) for line in de10.lines])
+        de10.lines = []
+    print(writer.report())
+    assert writer.sent == 5 + 2 and writer.keepalives == 2   # 25.0 25.5 26.0 26.5 27.0, then 2 keepalives
+    assert writer.echo_ok == writer.sent and writer.echo_missing == 0
+    writer.check_echo([99.9])
+    assert writer.echo_bad == 1
+
+    # Unplugged: nothing raises, the newest value is sent once the port works again
+    de10.unplugged = True
+    for i in range(500, 510):
+        now[0] = i * 0.01
+        assert not writer.submit(30.0 + i * 0.1)
+    assert writer.failed == 10 and writer.error is not None and writer.pending == 30.0 + 509 * 0.1
+    de10.unplugged = False
+    now[0] += 0.01
+    assert writer.poll() and de10.lines == [b"80.9\n"] and writer.error is None
+    print(writer.report())
+    print("OK")